@@ -0,0 +1,13 @@
+"""
+Benchmarks of the annotator
+
+    python -m benchmarks.corpus --form=A+一+B --sentences=10000 --output=../data/input/A+一+B_synthetic.xml
+    python -m benchmarks.layers --form=A+一+B --sentences=10000 --output=results.json
+"""
+import os
+import sys
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+if SOURCE not in sys.path:
+    sys.path.insert(0, SOURCE)
@@ -0,0 +1,124 @@
+"""
+Compare the per-sentence GaussianMixture with the BatchedMixture, and check that
+both give the same labels and statuses on a corpus and on edge cases
+
+    python -m benchmarks.bench_cluster --form=A+一+B --sentences=5000
+    python -m benchmarks.bench_cluster --form=A+一+B --path=data/input/A+一+B_sample.xml
+
+BatchedMixture repeats the k-means++ seeding, the stopping rules of k-means
+and the relocation of its empty clusters as sklearn implements them, which
+are not part of its API. Run this check after upgrading scikit-learn, it
+exits with 1 when any label or status differs.
+"""
+from benchmarks import SOURCE
+from benchmarks.corpus import Generator
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import sklearn
+from config import Config
+from annotator import Annotator
+from clustering import _fit
+from mixture import BatchedMixture
+
+
+def corpus_curves(form, path):
+    """ The points of the sentences of a corpus, as Annotator.cluster gives them """
+    os.chdir(SOURCE)
+    config = Config()
+    config.input_path = "{}"
+    annotator = Annotator(config, form, path)
+    annotator.initialize()
+    annotator.verbose = False
+    annotator.transform()
+
+    return [np.column_stack((np.arange(len(y)), y)) for mark, y in annotator.features.curves()]
+
+
+def edge_curves(seed, count):
+    """ Short, flat, repeated, large and non-finite curves, where the ties and the fallbacks are """
+    random = np.random.RandomState(seed)
+    curves = list()
+
+    for _ in range(count):
+        length = random.randint(1, 40)
+        x = np.arange(length)
+        kind = random.randint(6)
+        if kind == 0:
+            y = random.normal(size=length)
+        elif kind == 1:
+            y = np.zeros(length)
+        elif kind == 2:
+            y = random.choice([0.5, 1.0, 1.5], size=length)
+        elif kind == 3:
+            y = np.round(random.normal(size=length), 1)
+        elif kind == 4:
+            y = random.normal(scale=1e8, size=length)
+        else:
+            y = random.normal(size=length)
+            y[random.randint(length)] = random.choice([np.nan, np.inf])
+        curves.append(np.column_stack((x, y)))
+
+    return curves
+
+
+def compare(curves, seed, min_length):
+    """
+    Fit the curves with both engines
+    :return: tuple - the numbers of sentences with different labels and different statuses, and the times
+    """
+    start = time.perf_counter()
+    reference = [_fit(points, 3, seed, min_length) for points in curves]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = BatchedMixture(3, seed, min_length).fit_predict(curves)
+    batched_time = time.perf_counter() - start
+
+    labels, statuses = 0, 0
+    for (expected, status), (actual, other) in zip(reference, batched):
+        statuses += status != other
+        if expected is None or actual is None:
+            labels += expected is not actual
+        else:
+            labels += not np.array_equal(expected, actual)
+
+    return labels, statuses, reference_time, batched_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the batched clustering against sklearn")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction")
+    parser.add_argument("-p", "--path", help="The .xml corpus to cluster, a synthetic one by default")
+    parser.add_argument("-n", "--sentences", type=int, default=5000, help="The number of synthetic sentences")
+    parser.add_argument("-e", "--edges", type=int, default=2000, help="The number of edge cases")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="The random state of the mixtures")
+    parser.add_argument("-m", "--min-length", type=int, default=3, help="The shortest sentence to fit")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.path is None:
+            path = os.path.join(directory, args.form + "_synthetic.xml")
+            Generator(args.form).write(path, args.sentences)
+        else:
+            path = os.path.abspath(args.path)
+
+        cases = (("corpus", corpus_curves(args.form, path)), ("edge cases", edge_curves(args.seed, args.edges)))
+
+    print("scikit-learn {}, numpy {}".format(sklearn.__version__, np.__version__))
+    different = 0
+    for name, curves in cases:
+        labels, statuses, reference_time, batched_time = compare(curves, args.seed, args.min_length)
+        different += labels + statuses
+        print("{}: {} sentences, different labels: {}, different statuses: {}".format(
+            name, len(curves), labels, statuses))
+        print("    sklearn: {:.3f}s, batched: {:.3f}s".format(reference_time, batched_time))
+
+    if different > 0:
+        sys.exit(1)
@@ -0,0 +1,94 @@
+"""
+Compare the per-sentence PolynomialRegression with the batched Smoother, and
+check that both choose the same increasing sections on a reference corpus,
+exiting with 1 when they differ beyond ties
+
+    python bench_fit.py --path=../data/input/A+一+B_sample.xml --form=A+一+B
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SOURCE)
+
+import numpy as np
+import utils
+from config import Config
+from annotator import Annotator
+
+
+def per_sentence(curves, degree):
+    """ The former Annotator.fit: one pipeline per sentence """
+    results = list()
+
+    for y in curves:
+        x = np.arange(len(y)).reshape(-1, 1)
+        try:
+            results.append(utils.PolynomialRegression(degree).fit(x, y).predict(x))
+        except ValueError:
+            # x ** degree overflows, the former code aborted here
+            results.append(None)
+
+    return results
+
+
+def steps(sections):
+    """ The increasing steps (i - 1, i) chosen by utils.growth """
+    return set((section[i - 1], section[i]) for section in sections for i in range(1, len(section)))
+
+
+def tied(y_hat, sections, other):
+    """ Check if two choices differ only where neighbouring values are equal up to noise """
+    scale = max(1.0, float(np.abs(y_hat).max()))
+    return all(abs(y_hat[i] - y_hat[i - 1]) < 1e-6 * scale for _, i in steps(sections) ^ steps(other))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the curve fitting layer")
+    parser.add_argument("-p", "--path", required=True, help="The .xml corpus to fit")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction")
+    parser.add_argument("-d", "--degree", type=int, default=100, help="The degree of the polynomial")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    path = os.path.abspath(args.path)
+    os.chdir(SOURCE)
+    config = Config()
+    config.input_path = "{}"
+    annotator = Annotator(config, args.form, path)
+    annotator.initialize()
+    curves = [y for mark, y in annotator._process()]
+
+    start = time.perf_counter()
+    legacy = per_sentence(curves, args.degree)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = annotator.smoother.fit_transform(curves)
+    current_time = time.perf_counter() - start
+
+    same, ties, different, overflow = 0, 0, 0, 0
+    for reference, y_hat in zip(legacy, current):
+        if reference is None:
+            overflow += 1
+            continue
+
+        expected, actual = utils.growth(list(reference)), utils.growth(list(y_hat))
+        if expected == actual:
+            same += 1
+        elif tied(reference, expected, actual):
+            ties += 1
+        else:
+            different += 1
+
+    print("sentences: {}, lengths: {}".format(len(curves), len(set(len(y) for y in curves))))
+    print("per-sentence: {:.3f}s ({:.0f} sentences/s)".format(legacy_time, len(curves) / legacy_time))
+    print("batched:      {:.3f}s ({:.0f} sentences/s)".format(current_time, len(curves) / current_time))
+    print("sections - same: {}, differ only on ties: {}, different: {}, overflow in former fit: {}".format(
+        same, ties, different, overflow))
+
+    if different > 0:
+        sys.exit(1)
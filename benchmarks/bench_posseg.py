@@ -0,0 +1,73 @@
+"""
+Compare the per-character POS tagging with the batched Segmenter
+
+    python bench_posseg.py --path=../data/input/A+一+B_sample.xml --form=A+一+B
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import jieba.posseg as pseg
+from reader import iterparse
+from segmenter import Segmenter
+
+
+def per_character(sentences):
+    """ The former Annotator._posseg: one jieba call per character """
+    results = list()
+
+    for sentence in sentences:
+        words, tags = list(), list()
+        for pair in [pseg.cut(word) for word in sentence]:
+            temp = dict(pair)
+            words += list(temp.keys())
+            tags += list(temp.values())
+        results.append((words, tags))
+
+    return results
+
+
+def batched(segmenter, sentences, size):
+    results = list()
+
+    for start in range(0, len(sentences), size):
+        results += segmenter.tag_batch(sentences[start:start + size])
+
+    return results
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    results = func(*args)
+    return results, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the word segmentation layer")
+    parser.add_argument("-p", "--path", required=True, help="The .xml corpus to segment")
+    parser.add_argument("-f", "--form", default="", help="The abstract form of the construction")
+    parser.add_argument("-d", "--userdict", default="../data/dict.txt", help="The user dictionary of jieba")
+    parser.add_argument("-b", "--batch", type=int, default=256, help="The number of sentences per jieba call")
+    args = parser.parse_args()
+
+    sentences = [sentence for mark, sentence in iterparse(args.path, args.form)]
+    characters = sum(len(sentence) for sentence in sentences)
+
+    segmenter = Segmenter(args.userdict)
+    segmenter.initialize()
+
+    legacy, legacy_time = timeit(per_character, sentences)
+    current, current_time = timeit(batched, segmenter, sentences, args.batch)
+
+    aligned = all(len(words) == len(sentence) and len(tags) == len(sentence)
+                  for (words, tags), sentence in zip(current, sentences))
+    changed = sum(a != b for (_, old), (_, new) in zip(legacy, current) for a, b in zip(old, new))
+
+    print("sentences: {}, characters: {}".format(len(sentences), characters))
+    print("per-character: {:.3f}s ({:.0f} chars/s)".format(legacy_time, characters / legacy_time))
+    print("batched:       {:.3f}s ({:.0f} chars/s)".format(current_time, characters / current_time))
+    print("speedup: {:.1f}x, aligned: {}, tags changed by context: {}".format(
+        legacy_time / current_time, aligned, changed))
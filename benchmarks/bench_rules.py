@@ -0,0 +1,180 @@
+"""
+Compare the former decision tree and hypotheses of the fifth layer with the rule table on a corpus
+
+    python -m benchmarks.bench_rules --form=A+一+B --sentences=20000
+    python -m benchmarks.bench_rules --form=A+一+B --path=data/input/A+一+B_sample.xml
+
+The former code is kept here as the reference of tests/test_rules.py, which
+checks every combination of the features and every short sequence of labels.
+The script exits with 1 when the content of any sentence differs.
+"""
+from benchmarks import SOURCE
+from benchmarks.corpus import Generator
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+from config import Config
+from annotator import Annotator
+from features import TAGS
+
+CLASSES = ("others", "constant", "variable")
+LABELS = ("others", "constant", "variable")
+# The values the policies give to the scores, 1 is the neutral one
+REGEX = (0, 0.5, 1, 1.5, 2)
+DERIV = (0.2, 1, 1.2)
+AGREE = (0, 1)
+
+
+def decide(label, tag, regex, deriv, agree):
+    """ The former if/elif tree of Annotator._label for a character """
+    if label == "others":
+        if tag == "constant":
+            if regex != 1 and deriv != 1:
+                return "constant"
+            else:
+                return "others"
+        elif tag == "variable":
+            if agree == 1 and (regex != 1 or deriv != 1):
+                return "variable"
+            elif regex == 1 and deriv == 1:
+                return "others"
+            else:
+                return "variable"
+        else:
+            if regex != 1:
+                return "variable"
+            else:
+                return "others"
+
+    if label == "constant":
+        if tag == "constant":
+            if regex != 1 or deriv != 1:
+                return "constant"
+            else:
+                return "others"
+        elif tag == "variable":
+            if agree == 1:
+                return "variable"
+            elif regex != 1 and deriv != 1:
+                return "variable"
+            else:
+                return "others"
+        else:
+            return "others"
+
+    if label == "variable":
+        if tag == "constant":
+            return "constant"
+        else:
+            if regex == 1 and agree == 0:
+                return "others"
+            elif regex == 1 and deriv == 1:
+                return "others"
+            else:
+                return "variable"
+
+
+def smooth(series):
+    """ The former Hypothesis I, one character after another """
+    series = list(series)
+
+    for i in range(1, len(series) - 1):
+        if series[i - 1][1] == "others" and series[i + 1][1] == "others":
+            series[i] = (series[i][0], "others")
+
+    return series
+
+
+def content(sentence, length):
+    """ The former Annotator._content, with Hypothesis II over the whole content at each character """
+    context, construction, content, count = "", [], [], 0
+    for word, label in sentence:
+        if label == "others":
+            if len(construction) > 0:
+                content.append((construction, "cxn"))
+            construction = []
+            context += word
+        else:
+            if len(context) > 0:
+                content.append((context, "context"))
+            context = ""
+            construction.append((word, label))
+
+        if count >= len(sentence) - 1:
+            if len(construction) > 0:
+                content.append((construction, "cxn"))
+            if len(context) > 0:
+                content.append((context, "context"))
+
+        count += 1
+
+        for j in range(len(content)):
+            if content[j][1] == 'cxn' and len(content[j][0]) < length:
+                temp = ""
+
+                for w, l in content[j][0]:
+                    temp += w
+                content[j] = (temp, 'context')
+
+    return content
+
+
+def label(annotator, mark, labels):
+    """ The former Annotator._label """
+    feature = annotator.features.view(mark)
+    tags = [TAGS[code] for code in feature.tag]
+    classes = annotator.find(tags, labels)
+
+    series = list()
+    words = zip(feature.value, tags, feature.regex.tolist(), feature.deriv.tolist(), feature.agree.tolist())
+    for (value, tag, regex, deriv, agree), cluster in zip(words, labels):
+        series.append((value, decide(classes[str(cluster)], tag, regex, deriv, agree)))
+
+    return smooth(series)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the rules of the fifth layer against the former code")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction")
+    parser.add_argument("-p", "--path", help="The .xml corpus to annotate, a synthetic one by default")
+    parser.add_argument("-n", "--sentences", type=int, default=20000, help="The number of synthetic sentences")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    directory = tempfile.TemporaryDirectory()
+    if args.path is None:
+        path = os.path.join(directory.name, args.form + "_synthetic.xml")
+        Generator(args.form).write(path, args.sentences)
+    else:
+        path = os.path.abspath(args.path)
+
+    os.chdir(SOURCE)
+    config = Config()
+    config.input_path = "{}"
+    annotator = Annotator(config, args.form, path)
+    annotator.initialize()
+    annotator.verbose = False
+
+    clusters = [(mark, labels) for mark, labels in annotator.cluster() if labels is not None]
+
+    start = time.perf_counter()
+    legacy = [content(label(annotator, mark, labels), annotator._length) for mark, labels in clusters]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [annotator._content(annotator._label(mark, labels)) for mark, labels in clusters]
+    current_time = time.perf_counter() - start
+    directory.cleanup()
+
+    different = sum(expected != actual for expected, actual in zip(legacy, current))
+    instances = sum(label == "cxn" for result in current for text, label in result)
+    print("sentences: {}, instances: {}, different: {}".format(len(clusters), instances, different))
+    print("former: {:.3f}s ({:.0f} sentences/s)".format(legacy_time, len(clusters) / legacy_time))
+    print("table:  {:.3f}s ({:.0f} sentences/s)".format(current_time, len(clusters) / current_time))
+
+    if different > 0:
+        sys.exit(1)
@@ -0,0 +1,60 @@
+"""
+Measure the import time of each mode, like python -X importtime
+
+    python bench_startup.py --repeat=5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# The modules imported before any work is done in each mode
+TARGETS = {
+    "main": "import main",
+    "pipeline": "import main, pipeline",
+    "standard": "import main, annotator",
+    "batch": "import main, scheduler"
+}
+
+
+def importtime(statement):
+    """
+    Import the modules in a fresh interpreter
+    :param statement: string - the import statement
+    :return: dict - {module: (self, cumulative)} in microseconds
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                             cwd=SOURCE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    modules = dict()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+
+    return modules
+
+
+def total(modules):
+    """ The sum of the top-level imports """
+    return sum(own for own, cumulative in modules.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the startup of each mode")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="The number of fresh interpreters per mode")
+    parser.add_argument("-t", "--top", type=int, default=5, help="The number of heaviest modules to show")
+    args = parser.parse_args()
+
+    for mode, statement in TARGETS.items():
+        runs = [importtime(statement) for _ in range(args.repeat)]
+        best = min(runs, key=total)
+        heaviest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+
+        print("{:<9} {:>8.1f} ms  {} modules".format(mode, total(best) / 1000, len(best)))
+        for name, (own, cumulative) in heaviest:
+            print("          {:>8.1f} ms  {}".format(own / 1000, name))
@@ -0,0 +1,62 @@
+"""
+Measure how the transform layer scales with the number of sentences
+
+    python bench_transform.py --path=../data/input/A+一+B_sample.xml --form=A+一+B --sizes=1000,2000,4000,8000
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SOURCE)
+
+from config import Config
+from annotator import Annotator
+from reader import iterparse
+
+
+def measure(config, form, path, sentences):
+    """
+    Time the transform layer alone on the sentences
+    :return: float - seconds
+    """
+    annotator = Annotator(config, form, path)
+    annotator.initialize()
+    annotator.verbose = False
+    annotator.sentences = sentences
+
+    # Fit once, so that only the derivation is timed
+    fitted = annotator.fit()
+    annotator.fit = lambda sentences=None: fitted
+
+    start = time.perf_counter()
+    annotator.transform()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the scaling of the transform layer")
+    parser.add_argument("-p", "--path", required=True, help="The .xml corpus to sample the sentences from")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction")
+    parser.add_argument("-s", "--sizes", default="1000,2000,4000,8000", help="The numbers of sentences")
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    os.chdir(SOURCE)
+    config = Config()
+    config.input_path = "{}"
+
+    corpus = [sentence for mark, sentence in iterparse(path, args.form)]
+    previous = None
+    for size in [int(size) for size in args.sizes.split(",")]:
+        sentences = [(args.form + "_" + str(index), sentence)
+                     for index, sentence in enumerate(itertools.islice(itertools.cycle(corpus), size))]
+        seconds = measure(config, args.form, path, sentences)
+
+        # Linear scaling keeps the time per sentence flat
+        print("{:>8} sentences: {:.3f}s, {:.1f} us/sentence{}".format(
+            size, seconds, seconds / size * 1e6,
+            "" if previous is None else ", x{:.2f} of the previous size".format(seconds / previous)))
+        previous = seconds
@@ -0,0 +1,95 @@
+"""
+Generate synthetic corpora of Chinese constructions
+
+    python -m benchmarks.corpus --form=X+就+Y --sentences=10000 --length=30 --density=0.2 --output=X+就+Y_synthetic.xml
+"""
+from xml.sax.saxutils import escape
+import argparse
+import random
+import re
+
+# Common characters to fill the context and the variables of the construction
+CHARACTERS = ("的是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家可下而过天去能对"
+              "小多然于心学么之都好看起发当没成只如事把还用第样道想作种开美总从无情己面最女但现前些所同日手又行意"
+              "动方期它头经长儿回位分爱老因很给名法间斯知世什两次使身者被高已亲其进此话常与活正感见明问力理尔点文"
+              "几定本公特做外孩相西果走将月十实向声车全信重三机工物气每并别真打太新比才便夫再书部水像眼等体却加电"
+              "主界门利海受听表德少克代员许先口由死安写性马光白或住难望教命花结乐色更拉东神记处让母父应直字场平"
+              "报友关放至张认接告入笑内英军候民岁往何度山觉路带万男边风解叫任金快原吃妈变通师立象数四失满战远格士")
+
+PUNCTUATIONS = "，，，。！？；"
+
+
+def components(form):
+    """
+    Split the form into constants and variables
+    :param form: string - the abstract form, e.g. A+一+B
+    :return: list of tuples - (component, True if it is a variable)
+    """
+    return [(component, re.search("[a-zA-Z]", component) is not None) for component in form.split("+")]
+
+
+class Generator(object):
+    """ Generate sentences with instances of a construction at a given density """
+
+    def __init__(self, form, length=20, density=0.3, seed=0):
+        self.form = form
+        self.length = length
+        self.density = density
+        self.random = random.Random(seed)
+        self.components = components(form)
+
+        # The constants never appear by chance, so the density is exact
+        constants = "".join(component for component, variable in self.components if not variable)
+        self.characters = [character for character in CHARACTERS if character not in constants]
+
+    def _word(self, low, high):
+        return "".join(self.random.choice(self.characters) for _ in range(self.random.randint(low, high)))
+
+    def instance(self):
+        """ An instance of the construction, every variable is a word of 1 to 2 characters """
+        return "".join(self._word(1, 2) if variable else component for component, variable in self.components)
+
+    def sentence(self):
+        """ A sentence of about self.length characters """
+        length = max(1, int(self.random.gauss(self.length, self.length / 4)))
+        characters = list(self._word(length, length))
+
+        # Split the context into clauses
+        for index in range(8, len(characters) - 1, 8 + self.random.randint(0, 8)):
+            characters[index] = self.random.choice(PUNCTUATIONS)
+
+        sentence = "".join(characters)
+        if self.random.random() < self.density:
+            position = self.random.randint(0, len(sentence))
+            sentence = sentence[:position] + self.instance() + sentence[position:]
+
+        return sentence + "。"
+
+    def write(self, path, sentences):
+        """
+        Write a <document><sentence> corpus
+        :param path: string - the path of the .xml file
+        :param sentences: int - the number of sentences
+        """
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write('<?xml version="1.0" encoding="UTF-8"?>' + "\n")
+            fp.write("<document>" + "\n")
+
+            for _ in range(sentences):
+                fp.write("\t<sentence>" + escape(self.sentence()) + "</sentence>\n")
+
+            fp.write("</document>")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus of a construction")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction, e.g. A+一+B")
+    parser.add_argument("-n", "--sentences", type=int, default=10000, help="The number of sentences")
+    parser.add_argument("-l", "--length", type=int, default=20, help="The mean length of the sentences")
+    parser.add_argument("-d", "--density", type=float, default=0.3, help="The ratio of sentences with an instance")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="The random seed")
+    parser.add_argument("-o", "--output", required=True, help="The path of the .xml file")
+    args = parser.parse_args()
+
+    Generator(args.form, args.length, args.density, args.seed).write(args.output, args.sentences)
+    print("Done! {} sentences of [{}] were written to {}".format(args.sentences, args.form, args.output))
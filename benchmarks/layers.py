@@ -0,0 +1,197 @@
+"""
+Time each layer of the annotator on a synthetic corpus
+
+    python -m benchmarks.layers --form=A+一+B --sentences=10000 --output=results.json
+    python -m benchmarks.layers --form=A+一+B --sentences=10000 --baseline=results.json
+"""
+from benchmarks import SOURCE
+from benchmarks.corpus import Generator
+from metrics import Metrics, peak_rss
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import types
+
+STANDARD = ("Processor.load", "_build", "_policy", "_process", "fit", "transform", "cluster", "annotate", "store")
+PIPELINE = ("Pipeline.load", "Pipeline.annotate")
+
+
+def wrap(metrics, function, name):
+    """ Time the calls of a function as a layer, and the iteration of the generator it returns """
+    def timed(*args, **kwargs):
+        with metrics.layer(name):
+            result = function(*args, **kwargs)
+
+        if isinstance(result, types.GeneratorType):
+            return metrics.iterate(result, name)
+
+        return result
+
+    return timed
+
+
+def exclusive(metrics):
+    """ The wall time of each layer, the time of the nested layers excluded """
+    return OrderedDict((name, wall) for name, (calls, wall, cpu) in metrics.layers.items())
+
+
+def configure(directory, cache, workers):
+    from config import Config
+
+    os.chdir(SOURCE)
+    config = Config()
+    config.input_path = os.path.join(directory, "{}")
+    config.output_path = os.path.join(directory, "standard_{}")
+    config.output_pipe = os.path.join(directory, "pipeline_{}")
+    if not cache:
+        config.cache = dict()
+    if workers is not None:
+        config.cluster = dict(config.cluster, workers=workers)
+
+    return config
+
+
+def standard(directory, corpus, form, cache, workers):
+    """ Annotate the corpus in standard mode with every layer timed """
+    from annotator import Annotator
+
+    config = configure(directory, cache, workers)
+    metrics = Metrics("standard", form, corpus)
+
+    annotator = Annotator(config, form, corpus)
+    annotator.initialize()
+    annotator.sentences = metrics.iterate(annotator.sentences, "Processor.load")
+
+    for method, name in (("_construct", "_build"), ("_build", "_build"), ("_posseg", "_policy"),
+                         ("_policy", "_policy"), ("_process", "_process"), ("fit", "fit"),
+                         ("transform", "transform"), ("cluster", "cluster"), ("annotate", "annotate"),
+                         ("store", "store")):
+        setattr(annotator, method, wrap(metrics, getattr(annotator, method), name))
+
+    annotator.store()
+    return exclusive(metrics), peak_rss()
+
+
+def pipeline(directory, corpus, form, cache, workers):
+    """ Annotate the corpus in pipeline mode """
+    from pipeline import Pipeline
+
+    config = configure(directory, cache, workers)
+    metrics = Metrics("pipeline", form, corpus)
+
+    runner = Pipeline(config, form, corpus)
+    load = runner._load
+    runner._load = lambda: metrics.iterate(load(), "Pipeline.load")
+    runner.annotate = wrap(metrics, runner.annotate, "Pipeline.annotate")
+
+    runner.annotate()
+    return exclusive(metrics), peak_rss()
+
+
+def isolate(function, *args):
+    """ Run the mode in a fresh process, so that its peak memory is its own """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def summarize(seconds, layers, sentences, characters, peak):
+    results = OrderedDict()
+
+    for name in layers:
+        spent = seconds.get(name, 0.0)
+        results[name] = OrderedDict([
+            ("seconds", round(spent, 6)),
+            ("sentences_per_second", round(sentences / spent, 1) if spent > 0 else None),
+            ("characters_per_second", round(characters / spent, 1) if spent > 0 else None)
+        ])
+
+    total = sum(seconds.values())
+    return OrderedDict([
+        ("seconds", round(total, 6)),
+        ("sentences_per_second", round(sentences / total, 1) if total > 0 else None),
+        ("peak_rss_mb", round(peak, 1)),
+        ("layers", results)
+    ])
+
+
+def compare(results, baseline):
+    """ Print the ratio of the time of each layer to the baseline """
+    for mode in ("standard", "pipeline"):
+        if mode not in results or mode not in baseline:
+            continue
+
+        for name, layer in results[mode]["layers"].items():
+            before = baseline[mode]["layers"].get(name, dict()).get("seconds")
+            if before:
+                print("{:<9} {:<18} {:>10.3f}s -> {:>10.3f}s  x{:.2f}".format(
+                    mode, name, before, layer["seconds"], layer["seconds"] / before))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark each layer of the annotator")
+    parser.add_argument("-f", "--form", required=True, help="The abstract form of the construction, e.g. A+一+B")
+    parser.add_argument("-n", "--sentences", type=int, default=10000, help="The number of sentences")
+    parser.add_argument("-l", "--length", type=int, default=20, help="The mean length of the sentences")
+    parser.add_argument("-d", "--density", type=float, default=0.3, help="The ratio of sentences with an instance")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="The random seed of the corpus")
+    parser.add_argument("-w", "--workers", type=int, help="The number of processes of the cluster layer")
+    parser.add_argument("-c", "--cache", action="store_true", help="Use the on-disk cache of segmentation")
+    parser.add_argument("-m", "--modes", default="standard,pipeline", help="The modes to benchmark")
+    parser.add_argument("-o", "--output", default="results.json", help="The JSON file of the results")
+    parser.add_argument("-b", "--baseline", help="A former JSON file of results to compare with")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    modes = args.modes.split(",")
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = args.form + "_synthetic.xml"
+        generator = Generator(args.form, args.length, args.density, args.seed)
+        generator.write(os.path.join(directory, corpus), args.sentences)
+
+        with open(os.path.join(directory, corpus), encoding="utf-8") as fp:
+            characters = sum(len(line.strip()) - len("<sentence></sentence>") for line in fp
+                             if line.strip().startswith("<sentence>"))
+
+        results = OrderedDict([("meta", OrderedDict([
+            ("form", args.form),
+            ("sentences", args.sentences),
+            ("characters", characters),
+            ("length", args.length),
+            ("density", args.density),
+            ("seed", args.seed),
+            ("cache", args.cache),
+            ("workers", args.workers),
+            ("python", platform.python_version()),
+            ("platform", platform.platform()),
+            ("time", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        ]))])
+
+        for mode, function, layers in (("standard", standard, STANDARD), ("pipeline", pipeline, PIPELINE)):
+            if mode in modes:
+                seconds, peak = isolate(function, directory, corpus, args.form, args.cache, args.workers)
+                results[mode] = summarize(seconds, layers, args.sentences, characters, peak)
+
+    with open(output, "w", encoding="utf-8") as fp:
+        json.dump(results, fp, ensure_ascii=False, indent=4)
+
+    for mode in modes:
+        if mode in results:
+            print("{}: {:.3f}s, {} sentences/s, peak {} MB".format(
+                mode, results[mode]["seconds"], results[mode]["sentences_per_second"], results[mode]["peak_rss_mb"]))
+            for name, layer in results[mode]["layers"].items():
+                print("    {:<18} {:>10.3f}s  {} sentences/s".format(name, layer["seconds"],
+                                                                    layer["sentences_per_second"]))
+
+    if baseline is not None:
+        with open(baseline, encoding="utf-8") as fp:
+            compare(results, json.load(fp))
+
+    print("Complete! The results were stored in " + output)
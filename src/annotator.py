@@ -1,74 +1,101 @@
 from processor import Processor
+from segmenter import Segmenter
+from cache import SegmentCache, fingerprint
+from smoother import Smoother
+from clustering import Clusterer
+from features import FeatureStore, TAGS, CODES
+from prefilter import Prefilter
+from writer import fragment, open_writer
+from checkpoint import Checkpoint
+from metrics import Metrics, timed
+from dedup import Memo, digest
+from matcher import Matcher
+from collections import OrderedDict, Counter
 from tqdm import tqdm
-from sklearn.mixture import GaussianMixture
-import jieba
-import jieba.posseg as pseg
 import utils
+import rules
 import numpy as np
+import itertools
+import json
 import re
 
 
+# The counters of the run report for the sentences whose clustering went wrong
+FALLBACKS = {"short": "short_sentences", "failed": "gmm_failures", "diverged": "gmm_not_converged"}
+# The counters of a run, reported as 0 when nothing was counted
+COUNTERS = ("regex_matches", "match_budget_exceeded", "jieba_calls", "skipped_sentences", "duplicate_sentences",
+            "fit_fallbacks", "short_sentences", "gmm_failures", "gmm_not_converged", "fallbacks")
+
+
 class Annotator(object):
     def __init__(self, config, form, path):
         self.conf = config
         self.form = form
         self.path = path
         self.processor = Processor(self.conf, self.path, self.form)
-        self.sentences = self.processor.load()
+        self.metrics = Metrics("standard", self.form, self.path)
+        for name in COUNTERS:
+            self.metrics.count(name, 0)
+        self.sentences = self.metrics.iterate(self.processor.load(), "load")
         self.pattern, self.construction = self.processor.construct(4)
-        self.features = dict()
+        self.matcher = Matcher(self.form, self.pattern, 4, **getattr(self.conf, "matcher", dict()))
+        self.features = FeatureStore()
+        self.verbose = True
+        self.segmenter = Segmenter(self.conf.userdict, cache=self._cache())
+        self.smoother = Smoother(100)
+        self.clusterer = Clusterer(3, **self.conf.cluster)
         self._length = len(self.form.split('+'))
         self._constants = [key for key, value in self.construction.items() if value == "constant"]
+        self.prefilter = Prefilter(self._constants)
+        self.memo = Memo(getattr(self.conf, "dedup", dict()).get("capacity", 0))
+
+    def _cache(self):
+        """ Create the on-disk cache of segmentation if it is configured """
+        options = getattr(self.conf, "cache", dict())
+
+        if not options.get("path"):
+            return None
+
+        return SegmentCache(options["path"], self.conf.userdict, options["capacity"])
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
 
     # Initialize
     def initialize(self):
-        jieba.load_userdict(self.conf.userdict)
+        if self.segmenter.cache is None:
+            self.segmenter.initialize()
+        else:
+            # jieba will be loaded on the first cache miss only
+            self.segmenter.cache.open()
 
     # First Layer
-    @staticmethod
-    def _construct(sentence):
-        """ Build the preliminary data structure for sentence """
-        count = 0
-        feature = dict()
-
-        for word in sentence:
-            if str(count) not in feature.keys():
-                feature[str(count)] = dict()
-
-            feature[str(count)]["value"] = word
-            feature[str(count)]["tag"] = ''
-            feature[str(count)]["regex"] = 1
-            feature[str(count)]["policy"] = 0
-            feature[str(count)]["deriv"] = 1
-            feature[str(count)]["agree"] = 0
-
-            count += 1
-
-        return feature
+    @timed("build")
+    def _construct(self, index, sentence, active=True):
+        """ Build the preliminary features of the characters of sentence """
+        return self.features.append(index, sentence, active)
 
     def _match(self, sentence):
-        """ Get the candidate by RegEx preliminarily """
-        return re.findall(self.pattern, sentence)
+        """ Get the spans of candidates by RegEx preliminarily """
+        return self.matcher.spans(sentence)
 
+    @timed("build")
     def _build(self, index, sentence):
         """
         Bestow weights on candidate by regex
         :param index: string - the mark of the sentence
         :param sentence: string
-        :return: dict - update the policy of the feature
+        :return: Feature - update the regex of the feature
         """
-        feature = self.features[index]
-        constructions = self._match(sentence)
-
-        for construction in constructions:
-            start = sentence.index(construction)
-            end = start + len(construction)
-
-            for key, val in feature.items():
-                if int(key) not in range(start, end):
-                    continue
+        feature = self.features.view(index)
+        exceeded = self.matcher.exceeded
+        spans = self._match(sentence)
+        self.metrics.count("regex_matches", len(spans))
+        self.metrics.count("match_budget_exceeded", self.matcher.exceeded - exceeded)
 
-                val["regex"] += 0.5
+        for start, end in spans:
+            feature.regex[start:end] += 0.5
 
         return feature
 
@@ -79,30 +106,27 @@ class Annotator(object):
         return shared
 
     # Third Layer
-    @staticmethod
-    def _posseg(sentence):
+    @timed("posseg")
+    def _posseg(self, sentences):
         """
-        Word Segmentation and POS Tagging
-        :param sentence: string
-        :return: tuple - words and their tags
+        Word Segmentation and POS Tagging of a batch of sentences
+        :param sentences: list of string
+        :return: list of tuples - characters and the tags of their tokens
         """
-        words, tags = list(), list()
-        pairs = [pseg.cut(word) for word in sentence]
-
-        for pair in pairs:
-            temp = dict(pair)
-            words += list(temp.keys())
-            tags += list(temp.values())
+        calls = self.segmenter.calls
+        pairs = self.segmenter.tag_batch(sentences)
+        self.metrics.count("jieba_calls", self.segmenter.calls - calls)
 
-        return words, tags
+        return pairs
 
-    def _observe(self, word, tag, count, sentence, feature):
+    def _observe(self, word, tag, count, sentence, regex):
         """
         Observe the series when the construction **do not** contain X or Y
         :param word: string
         :param tag: string
         :param count: int
         :param sentence: string
+        :param regex: float - the regex score of the word
         :return: the type of the word
         """
         # phrase = sentence[count:count + self._length]
@@ -116,7 +140,7 @@ class Annotator(object):
                 if constant in phrase:
                     return "variable"
         else:
-            if feature["regex"] != 1:
+            if regex != 1:
                 return "variable"
 
         return "others"
@@ -158,337 +182,419 @@ class Annotator(object):
 
         return segments
 
-    def _policy(self, index, sentence):
+    @timed("policy")
+    def _policy(self, index, sentence, words, tags):
         """
         Create policy based on pos of word
         :param index: string - the mark of the sentence
         :param sentence: string
-        :return: dict - update the policy of the feature
+        :param words: list - the characters of the sentence
+        :param tags: list - the tag of each character
+        :return: Feature - update the policy of the feature
         """
-        feature = self.features[index]
-        words, tags = self._posseg(sentence)
+        feature = self.features.view(index)
         score, count = 0, 0
         segments = self._complex(sentence)
+        shared = self.agree()
+        regex, agree = feature.regex.tolist(), feature.agree.tolist()
+        steps, scores = list(), list()
 
         for word, tag in zip(words, tags):
             if len(segments) > 0 and utils.contains(["X", "Y", "Z"], self.construction):
                 step = self._judge(segments, word, sentence, count)
             else:
-                step = self._observe(word, tag, count, sentence, feature[str(count)])
+                step = self._observe(word, tag, count, sentence, regex[count])
 
             score += self.conf.policies[step]
             # update the feature
-            feature[str(count)]["tag"] = step
-            feature[str(count)]["policy"] = score
-            if score < 0 and feature[str(count)]["regex"] == 1.5:
-                feature[str(count)]["regex"] = 0.5
-
-            shared = self.agree()
+            steps.append(CODES[step])
+            scores.append(score)
+            if score < 0 and regex[count] == 1.5:
+                regex[count] = 0.5
 
             if word in shared:
-                feature[str(count)]["agree"] = 1
+                agree[count] = 1
 
             if step == "variable" and len(shared) > 0:
                 if "X" or "Y" or "Z" in shared:
-                    feature[str(count)]["agree"] = 1
+                    agree[count] = 1
                 elif tag in shared:
-                    feature[str(count)]["agree"] = 1
+                    agree[count] = 1
 
             count += 1
 
+        feature.tag[:count] = steps
+        feature.policy[:count] = scores
+        feature.regex[:] = regex
+        feature.agree[:] = agree
+
         return feature
 
-    def _process(self):
+    @timed("process")
+    def _process(self, sentences=None):
         """
         Process the sentences
-        :return: an array-like pairs
+        :param sentences: list of tuples - (mark, sentence), all the sentences by default
+        :return: list of tuples - the mark and the scores of each sentence
         """
-        curves = list()
-
         # Update the features by regex and posseg
-        for index, sentence in tqdm(self.sentences, desc="Processing the sentences"):
-            if index not in self.features.keys():
-                self.features[index] = self._construct(sentence)
-
-            # Processed in first layer
-            feature_regex = self._build(index, sentence)
-            self.features[index].update(feature_regex)
-
-            # Processed in third layer
-            feature_policy = self._policy(index, sentence)
-            agreements = [value["value"] for key, value in feature_policy.items() if value["agree"] == 1]
-            not_agree = [item for item in agreements if agreements.count(item) == 1]
-            for word in not_agree:
-                for key, value in feature_policy.items():
-                    if value["value"] == word:
-                        feature_policy[key]["tag"] = "others"
-                        feature_policy[key]["agree"] = 0
-                        feature_policy[key]["regex"] = 1
-            self.features[index].update(feature_policy)
+        sentences = self.sentences if sentences is None else sentences
+        sentences = tqdm(sentences, desc="Processing the sentences", disable=not self.verbose)
+        for batch in utils.chunked(sentences, self.conf.batch_size):
+            # The sentences without the constants go straight to the output
+            for index, sentence in batch:
+                if index not in self.features:
+                    self._construct(index, sentence, self.prefilter(sentence))
+
+            batch = [(index, sentence) for index, sentence in batch if self.features.is_active(index)]
+            pairs = self._posseg([sentence for index, sentence in batch])
+
+            for (index, sentence), (words, tags) in zip(batch, pairs):
+                # Processed in first layer
+                self._build(index, sentence)
+
+                # Processed in third layer
+                feature = self._policy(index, sentence, words, tags)
+                agreements = [feature.value[i] for i in np.flatnonzero(feature.agree)]
+                not_agree = set(item for item in agreements if agreements.count(item) == 1)
+                if len(not_agree) > 0:
+                    mask = np.array([value in not_agree for value in feature.value])
+                    feature.tag[mask] = CODES["others"]
+                    feature.agree[mask] = 0
+                    feature.regex[mask] = 1
+
+        self._log("Skipped {} of {} sentences without the constants".format(self.prefilter.skipped,
+                                                                             self.prefilter.total))
 
         # Get the points
-        for key, value in self.features.items():
-            points = list()
-
-            for position, features in value.items():
-                point_x = int(position)
-                point_y = features["policy"] * features["regex"] * features["deriv"]
-
-                points.append((point_x, point_y))
+        return self.features.curves()
 
-            curves.append((key, points))
-
-        return curves
+    @timed("fit")
+    def fit(self, sentences=None):
+        """
+        Fit the points of sentences
+        :return: dict - y_hat of each sentence, indexed by its mark
+        """
+        curves = self._process(sentences)
 
-    def fit(self):
-        """ Fit the points of sentences """
-        formulas, arguments, temp = list(), list(), list()
-        curves = self._process()
+        self._log("Start the fit the curve and get the candidate")
+        marks, points = list(), list()
+        for mark, y in curves:
+            marks.append(mark)
+            points.append(y)
 
-        print("Start the fit the curve and get the candidate")
-        for mark, points in curves:
-            # Get the data of points
-            x, y = utils.expend(points)
-            ploy_reg = utils.PolynomialRegression(100)
-            # Fit the points
-            ploy_reg.fit(x, y)
-            formulas.append((mark, ploy_reg))
-            arguments.append((mark, x))
-            temp.append((mark, y))
+        # Fit the points of all sentences, grouped by length
+        fallbacks = self.smoother.fallbacks
+        fitted = self.smoother.fit_transform(points)
+        self.metrics.count("fit_fallbacks", self.smoother.fallbacks - fallbacks)
 
-        return formulas, arguments, temp
+        return dict(zip(marks, fitted))
 
-    def transform(self):
+    @timed("transform")
+    def transform(self, sentences=None):
         """ Bestow weights on candidate by derivation """
-        formulas, arguments, temp = self.fit()
+        formulas = self.fit(sentences)
 
-        print("Get the candidate by derivation")
-        for mark, formula in formulas:
-            feature = self.features[mark]
+        self._log("Get the candidate by derivation")
+        for mark, y_hat in formulas.items():
+            feature = self.features.view(mark)
 
             # Derivation
-            x = utils.get(arguments, mark)
-            y = utils.get(temp, mark)
-
-            y_hat = formula.predict(x)
-
             sections = utils.growth(list(y_hat))
 
             candidates, phrase = [], ""
 
             for section in sections:
                 for index in section:
-                    phrase += feature[str(index)]['value']
+                    phrase += feature.value[index]
                 candidates.append(phrase)
                 phrase = ""
 
             candidates = "".join(utils.cut(candidates, self._constants))
 
-            for index, sentence in feature.items():
-                if sentence["value"] in candidates:
-                    sentence["deriv"] = 1.2 if sentence["policy"] > 0 else 0.2
-
-            self.features[mark].update(feature)
-        print("done")
+            mask = np.array([value in candidates for value in feature.value], dtype=bool)
+            feature.deriv[mask] = np.where(feature.policy[mask] > 0, 1.2, 0.2)
+        self._log("done")
 
     # Fourth Layer
-    def cluster(self):
-        self.transform()
+    @timed("cluster")
+    def cluster(self, sentences=None):
+        self.transform(sentences)
         # Get the points of data
-        curves = list()
-
-        # Get the points
-        for key, value in self.features.items():
-            points = list()
-
-            for position, features in value.items():
-                point_x = int(position)
-                point_y = features["policy"] * features["regex"] * features["deriv"]
-
-                points.append((point_x, point_y))
-
-            curves.append((key, points))
+        curves = self.features.curves()
 
         # Clustering
-        sentences = list()
-        gmm = GaussianMixture(n_components=3)
-        for mark, points in tqdm(curves, desc="clustering"):
-            sentence = list()
-            feature = self.features[mark]
+        points = [np.column_stack((np.arange(len(y)), y)) for mark, y in curves]
+        statuses = Counter(self.clusterer.statuses)
+        clusters = self.clusterer.fit_predict(points, self.verbose)
+        for status, count in (self.clusterer.statuses - statuses).items():
+            if status in FALLBACKS:
+                self.metrics.count(FALLBACKS[status], count)
 
-            points = np.array(points)
-            labels = gmm.fit_predict(points)
-
-            for i in range(len(labels)):
-                sentence.append((feature[str(i)], labels[i]))
-
-            sentences.append(sentence)
-        return sentences
+        return [(mark, labels) for (mark, y), labels in zip(curves, clusters)]
 
     # Fifth Layer
     @staticmethod
-    def find(sentence):
+    def find(tags, labels):
         classes = dict()
-        for word, label in sentence:
-            if str(label) not in classes.keys():
-                classes[str(label)] = dict()
-
-            if word["tag"] not in classes[str(label)].keys():
-                classes[str(label)][word["tag"]] = 0
-
-            classes[str(label)][word["tag"]] += 1
+        for tag, label in zip(tags, np.asarray(labels).tolist()):
+            counts = classes.setdefault(str(label), dict())
+            counts[tag] = counts.get(tag, 0) + 1
 
         classes = utils.classify(classes)
         return classes
 
-    def annotate(self):
-        sentences = self.cluster()
-
-        print("Annotating...")
-        results = []
-        for sentence in sentences:
-            classes = self.find(sentence)
-
-            series = []
-            for word, label in sentence:
-                label = str(label)
-
-                if classes[label] == "others":
-                    if word["tag"] == "constant":
-                        if word["regex"] != 1 and word["deriv"] != 1:
-                            series.append((word["value"], "constant"))
-                        else:
-                            series.append((word["value"], "others"))
-                    elif word["tag"] == "variable":
-                        if word["agree"] == 1 and (word["regex"] != 1 or word["deriv"] != 1):
-                            series.append((word["value"], "variable"))
-                        elif word["regex"] == 1 and word["deriv"] == 1:
-                            series.append((word["value"], "others"))
-                        else:
-                            series.append((word["value"], "variable"))
-                    else:
-                        if word["regex"] != 1:
-                            series.append((word["value"], "variable"))
-                        else:
-                            series.append((word["value"], "others"))
-
-                if classes[label] == "constant":
-                    if word["tag"] == "constant":
-                        if word["regex"] != 1 or word["deriv"] != 1:
-                            series.append((word["value"], "constant"))
-                        else:
-                            series.append((word["value"], "others"))
-                    elif word["tag"] == "variable":
-                        if word["agree"] == 1:
-                            series.append((word["value"], "variable"))
-                        elif word["regex"] != 1 and word["deriv"] != 1:
-                            series.append((word["value"], "variable"))
-                        else:
-                            series.append((word["value"], "others"))
-                    else:
-                        series.append((word["value"], "others"))
-
-                if classes[label] == "variable":
-                    if word["tag"] == "constant":
-                        series.append((word["value"], "constant"))
-                    else:
-                        if word["regex"] == 1 and word["agree"] == 0:
-                            series.append((word["value"], "others"))
-                        elif word["regex"] == 1 and word["deriv"] == 1:
-                            series.append((word["value"], "others"))
-                        else:
-                            series.append((word["value"], "variable"))
-
-            # Hypothesis I: the length of construction cannot be 1
-            for i in range(1, len(series) - 1):
-                if series[i - 1][1] == "others" and series[i + 1][1] == "others":
-                    series[i] = (series[i][0], "others")
-
-            results.append(series)
-
-        print("Write the data into the output file")
-        # Store the data
-        data = []
-        for sentence in results:
-            context, construction, content, count = "", [], [], 0
-            for word, label in sentence:
-                if label == "others":
-                    if len(construction) > 0:
-                        content.append((construction, "cxn"))
-                    construction = []
-                    context += word
-                else:
-                    if len(context) > 0:
-                        content.append((context, "context"))
-                    context = ""
-                    construction.append((word, label))
+    @timed("label")
+    def _label(self, mark, labels):
+        """
+        Label the characters of a sentence by their cluster and features
+        :param mark: string - the mark of the sentence
+        :param labels: np-array - the cluster of each character
+        :return: list of tuples - (character, label)
+        """
+        feature = self.features.view(mark)
+        classes = self.find([TAGS[code] for code in feature.tag], labels)
+
+        # The class of the cluster of each character
+        lookup = np.zeros(max(int(label) for label in classes) + 1, dtype=np.intp)
+        for label, name in classes.items():
+            lookup[int(label)] = CODES[name]
+
+        codes = rules.label(lookup[labels], feature.tag, feature.regex, feature.deriv, feature.agree)
+
+        # Hypothesis I: the length of construction cannot be 1
+        codes = rules.smooth(codes)
+
+        return list(zip(feature.value, [TAGS[code] for code in codes.tolist()]))
 
-                if count >= len(sentence) - 1:
-                    if len(construction) > 0:
-                        content.append((construction, "cxn"))
-                    if len(context) > 0:
-                        content.append((context, "context"))
+    @timed("label")
+    def _fallback(self, mark):
+        """
+        Label the characters of a sentence by their features alone, without the clusters
+        :param mark: string - the mark of the sentence
+        :return: list of tuples - (character, label)
+        """
+        feature = self.features.view(mark)
+        self.metrics.count("fallbacks")
+
+        series = list()
+        for value, code, regex in zip(feature.value, feature.tag.tolist(), feature.regex.tolist()):
+            tag = TAGS[code]
+            # Only the characters matched by the regex with a positive policy
+            if tag in ("constant", "variable") and regex > 1:
+                series.append((value, tag))
+            else:
+                series.append((value, "others"))
 
-                count += 1  # It is necessary to get the loop times
+        return series
+
+    @timed("label")
+    def _content(self, sentence):
+        """
+        Group the labelled characters into context and instances of construction
+        :param sentence: list of tuples - (character, label)
+        :return: list of tuples - (text, "context") or ([(word, label), ...], "cxn")
+        """
+        content = list()
 
+        for context, group in itertools.groupby(sentence, key=lambda item: item[1] == "others"):
+            group = list(group)
+
+            if context:
+                text = "".join(word for word, label in group)
+                if len(text) > 0:
+                    content.append((text, "context"))
+            elif len(group) < self._length:
                 # Hypothesis II: if the length of construction is smaller than that of form,
                 # it could not be an instance of construction
-                for j in range(len(content)):
-                    if content[j][1] == 'cxn' and len(content[j][0]) < self._length:
-                        temp = ""
-
-                        for w, l in content[j][0]:
-                            temp += w
-                        content[j] = (temp, 'context')
-
-            data.append(content)
-
-        return data
-
-    def store(self):
-        data = self.annotate()
-
-        with open(self.conf.output_path.format(self.path), "w") as out:
-            # Write the metadata
-            out.write('<?xml version="1.0" encoding="UTF-8"?>' + "\n")
-            # Write the root tag
-            out.write("<document>" + "\n")
-            # Write the data
-            for sentence in tqdm(data, desc="store the data"):
-                content = "\t<sentence>"
-                sentence = utils.reshape(sentence)
-
-                for phrase, label in sentence:
-                    # Pre-judgment
-                    if label == "cxn":
-                        temp = utils.tuple_to_str(phrase)
-
-                        for constant in self._constants:
-                            if constant not in temp:
-                                label = "context"
-                                phrase = temp
-                                break
-
-                    if label == "context":
-                        content += phrase
-                    else:
-                        content += "<cxn>"
-                        for words, tag in phrase:
-                            words = jieba.cut(words)
-
-                            for word in words:
-                                if tag == "variable":
-                                    content += "<variable>" + word + "</variable>"
-                                else:
-                                    content += "<constant>" + word + "</constant>"
-                        content += "</cxn>"
-                content += "</sentence>\n"
-                out.write(content)
-
-            out.write("</document>")
-        out.close()
+                content.append(("".join(word for word, label in group), "context"))
+            else:
+                content.append((group, "cxn"))
 
-        print("Complete! The data was stored in" + self.conf.output_path.format(self.form + "_" + self.path))
+        return content
+
+    def annotate(self, sentences=None):
+        """
+        Annotate the sentences one by one in the order of the corpus
+        :param sentences: list of tuples - (mark, sentence), all the sentences by default
+        :return: generator - (mark, content) of each sentence
+        """
+        clusters = dict(self.cluster(sentences))
+
+        self._log("Annotating...")
+        for mark in self.features:
+            if mark not in clusters:
+                # The sentence is wholly context
+                series = [(self.features.text(mark), "others")]
+            elif clusters[mark] is None:
+                # The sentence could not be clustered
+                series = self._fallback(mark)
+            else:
+                series = self._label(mark, clusters[mark])
+
+            yield mark, self._content(series)
+
+    def annotate_batch(self, batch):
+        """
+        Annotate a micro-batch of sentences, each distinct sentence once
+        :param batch: list of tuples - (mark, sentence)
+        :return: generator - (mark, content) of each sentence in the order of the batch
+        """
+        # Only the features of the current micro-batch are kept
+        self.features = FeatureStore()
+        keys = [digest(sentence) for mark, sentence in batch]
+
+        # Each distinct sentence is annotated once, the duplicates take its content
+        contents, fresh = dict(), OrderedDict()
+        for (mark, sentence), key in zip(batch, keys):
+            if key in contents or key in fresh:
+                continue
+
+            content = self.memo.get(key)
+            if content is None:
+                fresh[key] = (mark, sentence)
+            else:
+                contents[key] = content
+
+        for key, (mark, content) in zip(fresh.keys(), self.annotate(list(fresh.values()))):
+            contents[key] = content
+            self.memo.put(key, content)
+
+        self.metrics.count("duplicate_sentences", len(batch) - len(fresh))
+        for (mark, sentence), key in zip(batch, keys):
+            self.metrics.observe(sentence)
+            yield mark, contents[key]
 
+    def iter_annotate(self, size=None):
+        """
+        Push bounded micro-batches of sentences through all five layers
+        :param size: int - the number of sentences per micro-batch
+        :return: generator - (mark, content) of each sentence in the order of the corpus
+        """
+        verbose, self.verbose = self.verbose, False
+
+        try:
+            for batch in utils.chunked(self.sentences, size or self.conf.batch_size):
+                for mark, content in self.annotate_batch(batch):
+                    yield mark, content
+        finally:
+            self.verbose = verbose
+
+    @timed("render")
+    def _render(self, sentence):
+        """
+        Split the instances of construction into variables and constants
+        :param sentence: list of tuples - the content of a sentence
+        :return: list of tuples - (text, "context") or ([(word, tag), ...], "cxn")
+        """
+        results = list()
+
+        for phrase, label in utils.reshape(sentence):
+            # Pre-judgment
+            if label == "cxn":
+                temp = utils.tuple_to_str(phrase)
+
+                for constant in self._constants:
+                    if constant not in temp:
+                        label = "context"
+                        phrase = temp
+                        break
+
+            if label == "context":
+                results.append((phrase, "context"))
+            else:
+                words, calls = list(), self.segmenter.calls
+                for text, tag in phrase:
+                    tag = "variable" if tag == "variable" else "constant"
+                    words += [(word, tag) for word in self.segmenter.cut(text)]
+                results.append((words, "cxn"))
+                self.metrics.count("jieba_calls", self.segmenter.calls - calls)
+
+        return results
 
+    def _report(self, output):
+        """ Write the metrics of the run next to the output file """
+        options = getattr(self.conf, "metrics", dict())
 
+        self.metrics.count("skipped_sentences", self.prefilter.skipped)
+
+        if options.get("report", True):
+            report = self.metrics.dump(output, options.get("prometheus", False))
+            self._log("The metrics were stored in " + report)
+
+    def _checkpoint(self, resume):
+        """
+        Prepare the checkpoints of the run if they are configured
+        :param resume: boolean - continue from the checkpoints of a former run
+        :return: Checkpoint, None if checkpointing is off
+        """
+        options = getattr(self.conf, "checkpoint", dict())
+
+        if not options.get("path"):
+            return None
+
+        # The results depend on the dictionary, the policies, the clustering and the matcher as well as the corpus,
+        # the workers and the chunks of the clustering do not change them
+        cluster = dict((key, value) for key, value in self.conf.cluster.items() if key not in ("workers", "chunksize"))
+        settings = json.dumps({"userdict": fingerprint(self.conf.userdict), "policies": self.conf.policies,
+                               "cluster": cluster, "matcher": getattr(self.conf, "matcher", dict()),
+                               "window": self.matcher.window}, sort_keys=True)
+        # Each form of the corpus has its own checkpoints, as it has its own output
+        checkpoint = Checkpoint(options["path"].format(self.form + "_" + self.path), self.processor.path, self.form,
+                                settings, options.get("every", 10000))
+
+        if resume and checkpoint.load() > 0:
+            print("Resume from {} sentences finished in {}".format(checkpoint.done, checkpoint.directory))
+        else:
+            checkpoint.reset()
+
+        return checkpoint
+
+    def store(self, resume=False):
+        """
+        Annotate the corpus and write it to the output file
+        :param resume: boolean - skip the sentences finished by a former run
+        :return: int - the number of sentences
+        """
+        output = self.conf.output_path.format(self.path)
+        checkpoint = self._checkpoint(resume)
+        finished = checkpoint.done if checkpoint is not None else 0
+        self.metrics.start()
+
+        with open_writer(self.conf, output) as writer:
+            if finished > 0:
+                for text in checkpoint.fragments():
+                    writer.write_fragment(text)
+
+                # The finished sentences are parsed but not annotated again
+                self.sentences = itertools.islice(self.sentences, finished, None)
+
+            try:
+                # Write the sentences as soon as they are annotated
+                for mark, sentence in tqdm(self.iter_annotate(), desc="Annotating the sentences", initial=finished):
+                    text = fragment(self._render(sentence))
+
+                    with self.metrics.layer("write"):
+                        writer.write_fragment(text)
+                        if checkpoint is not None:
+                            checkpoint.add(text)
+            finally:
+                # The sentences finished before a failure are kept for --resume
+                if checkpoint is not None:
+                    checkpoint.flush()
+
+        if checkpoint is not None:
+            checkpoint.clear()
+
+        self.metrics.stop()
+        self._log("Skipped {} of {} sentences without the constants".format(self.prefilter.skipped,
+                                                                             self.prefilter.total))
+        self._log("Deduplicated {} of {} sentences".format(self.metrics.counters["duplicate_sentences"],
+                                                           self.metrics.sentences))
+
+        self.segmenter.close()
+        self.clusterer.close()
+        self._report(output)
+
+        print("Complete! The data was stored in" + self.conf.output_path.format(self.form + "_" + self.path))
+        return writer.count
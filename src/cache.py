@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+def fingerprint(path):
+    """
+    Get the fingerprint of a file by its content
+    :param path: string - the path of the file
+    :return: string - the sha1 hex digest, empty if the file does not exist
+    """
+    if not os.path.exists(path):
+        return ""
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 16), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class SegmentCache(object):
+    """ Content-addressed cache of segmentation results stored in sqlite """
+
+    def __init__(self, path, userdict, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.fingerprint = fingerprint(userdict)
+        self._connection = None
+        self._tick = 0
+        self._size = 0
+
+    def open(self):
+        if self._connection is not None:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = sqlite3.connect(self.path, timeout=30)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS segments "
+                                 "(key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS segments_used ON segments (used)")
+        self._tick, self._size = self._connection.execute(
+            "SELECT COALESCE(MAX(used), 0), COUNT(*) FROM segments").fetchone()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _key(self, namespace, text):
+        """ Hash the text together with the namespace and the user dictionary """
+        content = "\0".join([self.fingerprint, namespace, text])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def get_many(self, namespace, texts):
+        """
+        Look up the cached results of texts
+        :param namespace: string - the kind of result, e.g. "tag" or "cut"
+        :param texts: list of string
+        :return: dict - {text: result} for the texts found in the cache
+        """
+        self.open()
+        keys = dict((self._key(namespace, text), text) for text in texts)
+
+        results, hits = dict(), list()
+        for start in range(0, len(keys), 500):
+            chunk = list(keys.keys())[start:start + 500]
+            query = "SELECT key, value FROM segments WHERE key IN ({})".format(",".join("?" * len(chunk)))
+            for key, value in self._connection.execute(query, chunk):
+                results[keys[key]] = json.loads(value)
+                hits.append(key)
+
+        # Refresh the recency of the hits for the LRU eviction
+        if len(hits) > 0:
+            self._tick += 1
+            self._connection.executemany("UPDATE segments SET used = ? WHERE key = ?",
+                                         [(self._tick, key) for key in hits])
+            self._connection.commit()
+
+        return results
+
+    def put_many(self, namespace, items):
+        """
+        Store the results of texts
+        :param namespace: string - the kind of result, e.g. "tag" or "cut"
+        :param items: dict - {text: result}, the result must be JSON serializable
+        """
+        if len(items) == 0:
+            return
+
+        self.open()
+        self._tick += 1
+        self._connection.executemany("INSERT OR REPLACE INTO segments (key, value, used) VALUES (?, ?, ?)",
+                                     [(self._key(namespace, text), json.dumps(result, ensure_ascii=False),
+                                       self._tick) for text, result in items.items()])
+        # Replaced entries are counted twice, so recount before evicting
+        self._size += len(items)
+        if self._size > self.capacity:
+            self._evict()
+        self._connection.commit()
+
+    def _evict(self):
+        """ Drop the least recently used entries beyond the capacity """
+        size = self._connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+        if size > self.capacity:
+            self._connection.execute("DELETE FROM segments WHERE key IN "
+                                     "(SELECT key FROM segments ORDER BY used LIMIT ?)", (size - self.capacity,))
+            size = self.capacity
+
+        self._size = size
@@ -0,0 +1,132 @@
+from cache import fingerprint
+import hashlib
+import json
+import os
+import shutil
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _replace(path, text):
+    """ Write the file atomically, a crash leaves either the old or the new one """
+    with open(path + ".tmp", "w", encoding="utf-8") as fp:
+        fp.write(text)
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    os.replace(path + ".tmp", path)
+
+
+class Checkpoint(object):
+    """
+    Sharded checkpoints of the annotated sentences of a standard-mode run
+
+    The sentences are annotated in the order of the corpus, so a run is
+    resumed by skipping the sentences in the shards. Each shard holds the
+    rendered sentences of a run of consecutive sentences, the manifest
+    lists the shards with their digests and the corpus and settings they
+    belong to.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory, corpus, form, settings, every=10000):
+        self.directory = directory
+        self.corpus = corpus
+        self.form = form
+        self.settings = settings
+        self.every = every
+        self.shards = list()
+        self._fingerprint = None
+        self._buffer = list()
+
+    @property
+    def done(self):
+        """ The number of sentences in the shards """
+        return sum(shard["sentences"] for shard in self.shards)
+
+    @property
+    def manifest(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _identity(self):
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.corpus)
+
+        return {"version": Checkpoint.VERSION, "corpus": self.corpus, "fingerprint": self._fingerprint,
+                "form": self.form, "settings": self.settings}
+
+    def load(self):
+        """
+        Load the manifest of a former run of the same corpus
+        :return: int - the number of sentences already finished
+        """
+        if not os.path.exists(self.manifest):
+            return 0
+
+        with open(self.manifest, encoding="utf-8") as fp:
+            manifest = json.load(fp)
+
+        identity = self._identity()
+        for key, value in identity.items():
+            if manifest.get(key) != value:
+                raise ValueError("The checkpoint in {} was made with another {}, remove it to start over".format(
+                    self.directory, key))
+
+        # Only the intact shards at the head are kept
+        for shard in manifest["shards"]:
+            path = os.path.join(self.directory, shard["file"])
+            if not os.path.exists(path):
+                break
+
+            with open(path, encoding="utf-8") as fp:
+                if _sha1(fp.read()) != shard["sha1"]:
+                    break
+
+            self.shards.append(shard)
+
+        return self.done
+
+    def reset(self):
+        """ Drop the checkpoints of a former run """
+        self.clear()
+        os.makedirs(self.directory)
+
+    def fragments(self):
+        """
+        The rendered sentences in the shards
+        :return: generator - <sentence>...</sentence> of each finished sentence
+        """
+        for shard in self.shards:
+            with open(os.path.join(self.directory, shard["file"]), encoding="utf-8") as fp:
+                for line in fp:
+                    yield json.loads(line)
+
+    def add(self, text):
+        """ Record a finished sentence, a shard is written every so many sentences """
+        self._buffer.append(text)
+
+        if len(self._buffer) >= self.every:
+            self.flush()
+
+    def flush(self):
+        if len(self._buffer) == 0:
+            return
+
+        shard = "shard-{:05d}.jsonl".format(len(self.shards))
+        # One JSON string per line, the text of a sentence may contain line breaks
+        text = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in self._buffer)
+        _replace(os.path.join(self.directory, shard), text)
+
+        self.shards.append({"file": shard, "sentences": len(self._buffer), "sha1": _sha1(text)})
+        self._buffer = list()
+
+        manifest = dict(self._identity(), shards=self.shards)
+        _replace(self.manifest, json.dumps(manifest, ensure_ascii=False, indent=4))
+
+    def clear(self):
+        """ Remove the checkpoints once the output is complete """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
@@ -0,0 +1,108 @@
+from mixture import BatchedMixture
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from tqdm import tqdm
+import itertools
+import numpy as np
+import warnings
+
+
+def fit_predict(points, n_components, seed):
+    """
+    Cluster the points of a sentence
+    :param points: np-array - [(x, y), ...]
+    :param n_components: int - the number of clusters
+    :param seed: int - the random state of the initialization
+    :return: np-array - the label of each point, None if the sentence cannot be clustered
+    """
+    return _fit(points, n_components, seed)[0]
+
+
+def _fit(points, n_components, seed, min_length=None):
+    """
+    Cluster the points of a sentence, a failure is confined to the sentence
+    :return: tuple - the labels, None for a fallback, and the status of the fit,
+             one of "converged", "diverged", "short" or "failed"
+    """
+    # A mixture cannot have more components than points
+    if len(points) < max(n_components, min_length or 0):
+        return None, "short"
+
+    # sklearn is loaded on first use only
+    from sklearn.mixture import GaussianMixture
+
+    gmm = GaussianMixture(n_components=n_components, random_state=seed)
+    try:
+        # sklearn warns when EM does not converge, it is counted instead
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            labels = gmm.fit_predict(points)
+    except (ValueError, FloatingPointError, np.linalg.LinAlgError):
+        return None, "failed"
+
+    return labels, "converged" if gmm.converged_ else "diverged"
+
+
+class Clusterer(object):
+    """
+    Fit a GaussianMixture on each sentence, spread across a pool of processes
+
+    The "batched" engine fits the sentences at once with BatchedMixture in
+    this process instead. Its labels and statuses are those of sklearn as
+    checked by tests/test_mixture.py and benchmarks/bench_cluster.py against
+    scikit-learn 1.9.1, the version pinned in requirements.txt.
+    """
+
+    ENGINES = ("sklearn", "batched")
+
+    def __init__(self, n_components=3, workers=1, chunksize=64, seed=0, min_length=None, engine="sklearn"):
+        if engine not in Clusterer.ENGINES:
+            raise ValueError("Unknown engine of clustering {}, expected one of {}".format(engine, Clusterer.ENGINES))
+
+        self.n_components = n_components
+        self.workers = workers
+        self.chunksize = chunksize
+        # Every sentence is fitted with the same seed, so the labels do not
+        # depend on the number of workers or the chunking
+        self.seed = seed
+        # The sentences shorter than this take the fallback without a fit
+        self.min_length = min_length
+        self.engine = engine
+        self._mixture = BatchedMixture(n_components, seed, min_length)
+        self._pool = None
+        # The number of sentences by the status of their fit
+        self.statuses = Counter()
+
+    def _map(self, curves):
+        arguments = (curves, itertools.repeat(self.n_components), itertools.repeat(self.seed),
+                     itertools.repeat(self.min_length))
+
+        if self.workers <= 1 or len(curves) <= self.chunksize:
+            return map(_fit, *arguments)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        # The results are yielded in the order of the sentences
+        return self._pool.map(_fit, *arguments, chunksize=self.chunksize)
+
+    def fit_predict(self, curves, verbose=True):
+        """
+        Cluster the points of sentences
+        :param curves: list of np-array - the points of each sentence
+        :param verbose: boolean - show the progress bar
+        :return: list of np-array - the labels of each sentence in the same order,
+                 None for the sentences which could not be clustered
+        """
+        if self.engine == "batched":
+            results = self._mixture.fit_predict(curves)
+        else:
+            results = list(tqdm(self._map(curves), total=len(curves), desc="clustering", disable=not verbose))
+        self.statuses.update(status for labels, status in results)
+
+        return [labels for labels, status in results]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
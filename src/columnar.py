@@ -0,0 +1,253 @@
+from writer import XMLWriter, parse
+from array import array
+import numpy as np
+import mmap
+import os
+import shutil
+import struct
+
+MAGIC = b"CXNCOLS\0"
+VERSION = 1
+# magic, version, reserved, the numbers of sentences, characters and spans,
+# and the offsets of the characters, the index and the spans
+HEADER = struct.Struct("<8sIIQQQQQQ")
+LABELS = ("context", "cxn", "variable", "constant")
+CODES = dict((label, code) for code, label in enumerate(LABELS))
+
+
+def columnar_path(output):
+    """ The columnar file next to an output file, e.g. ../data/output/A+一+B.cols """
+    return os.path.splitext(output)[0] + ".cols"
+
+
+def _align(fp):
+    """ Pad the file to 8 bytes, so that every column can be mapped in place """
+    fp.write(b"\0" * (-fp.tell() % 8))
+    return fp.tell()
+
+
+class ColumnarWriter(object):
+    """
+    Write the annotated sentences in a columnar binary file
+
+    The file holds the characters of all the sentences as UTF-32, the index
+    of the first character and of the first span of each sentence, and the
+    spans in three columns: start and end, relative to the sentence, and
+    the code of the label. A context or an instance of construction is a
+    span, an instance is followed by the spans of its words. Every column is
+    a little-endian array, so the file is read by mapping it into memory.
+    The file is written aside and put in place only when the run succeeds,
+    so a failed run leaves no columnar file which looks complete.
+    """
+
+    def __init__(self, path, buffering=1 << 16):
+        self.path = path
+        self.buffering = buffering
+        self.count = 0
+        self._file = None
+        self._columns = None
+        # The first character and the first span of each sentence, and of the end
+        self._characters = array("Q", [0])
+        self._spans = array("Q", [0])
+        self._starts, self._ends, self._labels = array("I"), array("I"), array("B")
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self):
+        self._file = open(self.path + ".tmp", "wb", buffering=self.buffering)
+        self._file.write(b"\0" * HEADER.size)
+        # The spans are kept aside until the characters are all written
+        self._columns = [open(self.path + "." + name + ".tmp", "wb+") for name in ("starts", "ends", "labels")]
+
+    def _span(self, start, end, label):
+        self._starts.append(start)
+        self._ends.append(end)
+        self._labels.append(CODES[label])
+
+    def write(self, content):
+        """ Write a sentence, the content is as fragment takes it """
+        texts, position, spans = list(), 0, len(self._labels)
+
+        for phrase, label in content:
+            if label == "context":
+                # An empty context leaves no trace in the XML either
+                if len(phrase) > 0:
+                    self._span(position, position + len(phrase), "context")
+                    texts.append(phrase)
+                    position += len(phrase)
+                continue
+
+            instance = len(self._labels)
+            self._span(position, position, "cxn")
+            for word, tag in phrase:
+                if tag not in ("variable", "constant"):
+                    raise ValueError("Unknown label of a word: " + str(tag))
+
+                self._span(position, position + len(word), tag)
+                texts.append(word)
+                position += len(word)
+            self._ends[instance] = position
+
+        self._file.write("".join(texts).encode("utf-32-le"))
+        self._characters.append(self._characters[-1] + position)
+        self._spans.append(self._spans[-1] + len(self._labels) - spans)
+        self.count += 1
+
+        # The spans go to their columns every so often, so that the memory stays flat
+        if len(self._labels) >= 1 << 16:
+            self._flush()
+
+    def write_fragment(self, text):
+        """ Write a sentence already rendered by fragment """
+        self.write(parse(text))
+
+    def _flush(self):
+        columns = (self._starts, "<u4"), (self._ends, "<u4"), (self._labels, "u1")
+        for column, (values, dtype) in zip(self._columns, columns):
+            column.write(np.asarray(values, dtype=dtype).tobytes())
+
+        self._starts, self._ends, self._labels = array("I"), array("I"), array("B")
+
+    def close(self):
+        if self._file is None:
+            return
+
+        self._flush()
+        text = HEADER.size
+        index = _align(self._file)
+        for offsets in (self._characters, self._spans):
+            self._file.write(np.asarray(offsets, dtype="<u8").tobytes())
+
+        spans = _align(self._file)
+        for column in self._columns:
+            column.seek(0)
+            shutil.copyfileobj(column, self._file)
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, self.count, self._characters[-1], self._spans[-1],
+                                     text, index, spans))
+        self._discard()
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        """ Drop the file of a failed run """
+        if self._file is None:
+            return
+
+        self._discard()
+        os.remove(self.path + ".tmp")
+
+    def _discard(self):
+        for column in self._columns:
+            column.close()
+            os.remove(column.name)
+
+        self._file.close()
+        self._file = None
+
+
+class ColumnarReader(object):
+    """
+    Read a columnar file in place
+
+        with ColumnarReader("../data/output/A+一+B.cols") as reader:
+            reader.text(0), reader[0]                   # the text and the content of a sentence
+            np.bincount(reader.labels)                  # the number of spans by the code of the label
+            reader.export("../data/output/A+一+B.xml")  # the XML written by store()
+
+    The columns are numpy arrays over the mapped file: characters (code
+    points), index and offsets (the first character and the first span of
+    each sentence, and of the end), starts, ends and labels (of the spans).
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, sentences, characters, spans, text, index, columns = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError("{} is not a complete columnar file".format(path))
+        if version != VERSION:
+            self._map.close()
+            raise ValueError("{} is of version {}, expected {}".format(path, version, VERSION))
+
+        self.characters = np.frombuffer(self._map, dtype="<u4", count=characters, offset=text)
+        self.index = np.frombuffer(self._map, dtype="<u8", count=sentences + 1, offset=index)
+        self.offsets = np.frombuffer(self._map, dtype="<u8", count=sentences + 1, offset=index + 8 * (sentences + 1))
+        self.starts = np.frombuffer(self._map, dtype="<u4", count=spans, offset=columns)
+        self.ends = np.frombuffer(self._map, dtype="<u4", count=spans, offset=columns + 4 * spans)
+        self.labels = np.frombuffer(self._map, dtype="u1", count=spans, offset=columns + 8 * spans)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.index) - 1
+
+    def text(self, index):
+        """ The text of a sentence """
+        return self.characters[self.index[index]:self.index[index + 1]].tobytes().decode("utf-32-le")
+
+    def spans(self, index):
+        """
+        The spans of a sentence
+        :param index: int - the position of the sentence in the corpus
+        :return: tuple of np-array - the starts, ends and label codes of its spans
+        """
+        first, last = self.offsets[index], self.offsets[index + 1]
+        return self.starts[first:last], self.ends[first:last], self.labels[first:last]
+
+    def __getitem__(self, index):
+        """
+        The content of a sentence, as fragment takes it
+        :return: list of tuples - (text, "context") or ([(word, tag), ...], "cxn")
+        """
+        text, content = self.text(index), list()
+
+        for start, end, code in zip(*[column.tolist() for column in self.spans(index)]):
+            label = LABELS[code]
+            if label == "context":
+                content.append((text[start:end], "context"))
+            elif label == "cxn":
+                content.append((list(), "cxn"))
+            else:
+                content[-1][0].append((text[start:end], label))
+
+        return content
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def export(self, output):
+        """
+        Write the sentences as the XML output
+        :param output: string - the path of the .xml file
+        :return: int - the number of sentences
+        """
+        with XMLWriter(output) as writer:
+            for content in self:
+                writer.write(content)
+
+        return writer.count
+
+    def close(self):
+        # The arrays hold the map, they are released first
+        self.characters = self.index = self.offsets = self.starts = self.ends = self.labels = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
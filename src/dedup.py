@@ -0,0 +1,50 @@
+from collections import OrderedDict
+import hashlib
+
+
+def digest(text):
+    """
+    Hash the text of a sentence
+    :param text: string
+    :return: bytes - the 128-bit blake2b digest
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class Memo(object):
+    """
+    The results of the distinct sentences, keyed by the digest of their text
+
+    The annotation of a sentence depends on its text only, so a duplicate
+    takes the result of its first copy. At most capacity results are kept,
+    the least recently used are dropped first, a capacity of 0 disables it.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._results = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def get(self, key):
+        """
+        Get the result of a sentence seen before
+        :param key: bytes - the digest of the text, or the text itself
+        :return: the result, None if it is not memoized
+        """
+        result = self._results.get(key)
+
+        if result is not None:
+            self._results.move_to_end(key)
+
+        return result
+
+    def put(self, key, result):
+        if self.capacity <= 0:
+            return
+
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.capacity:
+            self._results.popitem(last=False)
@@ -0,0 +1,120 @@
+import numpy as np
+
+# The codes of the tags, 0 is the tag before the third layer
+TAGS = ("", "others", "variable", "constant")
+CODES = dict((tag, code) for code, tag in enumerate(TAGS))
+
+
+class Feature(object):
+    """ The features of the characters of one sentence, as views into the store """
+
+    def __init__(self, value, tag, regex, policy, deriv, agree):
+        self.value = value
+        self.tag = tag
+        self.regex = regex
+        self.policy = policy
+        self.deriv = deriv
+        self.agree = agree
+
+    def __len__(self):
+        return len(self.value)
+
+    def scores(self):
+        return self.policy * self.regex * self.deriv
+
+
+class FeatureStore(object):
+    """
+    Columnar features of the characters of a corpus
+
+    Every column is a flat array over all characters, and the characters of
+    the i-th sentence are at offsets[i]:offsets[i + 1]. An inactive sentence
+    keeps its place in the order but has no characters in the columns.
+    """
+
+    def __init__(self, capacity=1024):
+        self.marks = list()
+        self.texts = list()
+        self.active = list()
+        self.offsets = [0]
+        self._rows = dict()
+        self._size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        columns = {
+            "tag": np.zeros(capacity, dtype=np.int8),
+            "regex": np.ones(capacity),
+            "policy": np.zeros(capacity),
+            "deriv": np.ones(capacity),
+            "agree": np.zeros(capacity, dtype=np.int8)
+        }
+
+        for name, column in columns.items():
+            if hasattr(self, name):
+                column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+        self._capacity = capacity
+
+    def __len__(self):
+        return len(self.marks)
+
+    def __contains__(self, mark):
+        return mark in self._rows
+
+    def __iter__(self):
+        return iter(self.marks)
+
+    def append(self, mark, text, active=True):
+        """
+        Add a sentence with the preliminary features of its characters
+        :param mark: string - the mark of the sentence
+        :param text: string
+        :param active: boolean - False if the sentence skips the layers
+        :return: Feature - the features of the sentence
+        """
+        end = self._size + (len(text) if active else 0)
+        if end > self._capacity:
+            self._allocate(max(end, 2 * self._capacity))
+
+        self._rows[mark] = len(self.marks)
+        self.marks.append(mark)
+        self.texts.append(text)
+        self.active.append(active)
+        self.offsets.append(end)
+        self._size = end
+
+        return self.view(mark)
+
+    def text(self, mark):
+        return self.texts[self._rows[mark]]
+
+    def is_active(self, mark):
+        return self.active[self._rows[mark]]
+
+    def span(self, mark):
+        row = self._rows[mark]
+        return self.offsets[row], self.offsets[row + 1]
+
+    def view(self, mark):
+        """ Get the features of a sentence, writing to them updates the store """
+        start, end = self.span(mark)
+
+        return Feature(self.texts[self._rows[mark]],
+                       self.tag[start:end], self.regex[start:end], self.policy[start:end],
+                       self.deriv[start:end], self.agree[start:end])
+
+    def scores(self):
+        """ The score policy * regex * deriv of every character of the corpus """
+        size = self._size
+        return self.policy[:size] * self.regex[:size] * self.deriv[:size]
+
+    def curves(self):
+        """
+        Get the points of sentences
+        :return: list of tuples - (mark, y) of the active sentences, the points are at x = 0, 1, ...
+        """
+        scores = self.scores()
+        return [(mark, scores[self.offsets[row]:self.offsets[row + 1]])
+                for row, mark in enumerate(self.marks) if self.active[row]]
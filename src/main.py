@@ -1,6 +1,4 @@
 from config import Config
-from annotator import Annotator
-from pipeline import Pipeline
 import argparse
 
 
@@ -11,15 +9,72 @@ if __name__ == '__main__':
     # Get the path and form of a construction from command-line
     parser = argparse.ArgumentParser(description="Automatic Annotator for Chinese construction corpora")
     parser.add_argument("-p", "--path", help="The path (specifically file name) of the raw material of the construction")
-    parser.add_argument("-f", "--form", help="The abstract form of the construction")
+    parser.add_argument("-f", "--form", help="The abstract form of the construction, or several separated by commas "
+                                             "to annotate them together in standard mode")
     parser.add_argument("-m", "--mode", help="The mode of the system, the value could be one of [standard, pipeline]")
+    parser.add_argument("-b", "--batch", help="A directory or glob of corpora, the form is taken from each file name")
+    parser.add_argument("-w", "--workers", type=int, help="The number of worker processes in batch, server or pipeline mode")
+    parser.add_argument("-s", "--serve", action="store_true",
+                        help="Run as a server which keeps jieba and the constructions warm, see config.server")
+    parser.add_argument("-r", "--resume", action="store_true",
+                        help="Skip the sentences finished by a former standard-mode run of the same corpus")
+    parser.add_argument("-e", "--export", help="Export a columnar output file (.cols) to the XML file next to it")
     args = parser.parse_args()
 
-    if args.mode == "standard":
-        # Begin to Annotate
-        annotator = Annotator(config, args.form, args.path)
+    if args.export:
+        # The columnar output is written when output_formats lists "columnar"
+        from columnar import ColumnarReader
+        import os
+
+        output = os.path.splitext(args.export)[0] + ".xml"
+        with ColumnarReader(args.export) as reader:
+            count = reader.export(output)
+        print("Complete! {} sentences were exported to {}".format(count, output))
+    elif args.serve:
+        # Annotate on demand over HTTP, the workers are started once
+        from server import Server
+        import os
+
+        options = dict(config.server)
+        options["workers"] = args.workers or options.get("workers", 2)
+        options["socket"] = options.get("socket") or None
+        # /corpus is confined to the configured directories of the corpora and of the output
+        options["inputs"] = os.path.dirname(config.input_path)
+        options["outputs"] = os.path.dirname(config.output_path)
+        server = Server(**options)
+        server.run()
+    elif args.batch:
+        # Annotate every corpus in both modes unless a mode is given
+        from scheduler import Scheduler
+
+        modes = [args.mode] if args.mode else ["standard", "pipeline"]
+        scheduler = Scheduler(args.workers, modes, args.resume)
+        scheduler.run(args.batch)
+    elif args.mode == "standard" and "," in args.form:
+        if args.resume:
+            parser.error("--resume is not supported with several forms")
+
+        # Parse and segment the corpus once for all the constructions
+        from multi import MultiAnnotator
+
+        annotator = MultiAnnotator(config, args.form.split(","), args.path)
         annotator.initialize()
         annotator.store()
+    elif args.mode == "standard":
+        # Begin to Annotate, the heavy modules are only needed in standard mode
+        from annotator import Annotator
+
+        annotator = Annotator(config, args.form, args.path)
+        annotator.initialize()
+        annotator.store(args.resume)
     else:
+        if "," in args.form:
+            parser.error("several forms are only supported in standard mode")
+
+        from pipeline import Pipeline
+
+        if args.workers:
+            config.pipeline = dict(config.pipeline, workers=args.workers)
+
         pipeline = Pipeline(config, args.form, args.path)
         pipeline.annotate()
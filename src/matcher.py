@@ -0,0 +1,88 @@
+import re
+import time
+
+
+class Matcher(object):
+    """
+    Find the instances of a construction without unbounded backtracking
+
+    The lazy quantifiers of adjacent variables backtrack over the whole
+    sentence when a constant is found but the construction is not. An
+    instance is at most window characters per variable plus its constants
+    long, and its first constant lies within that reach of its start. So
+    only the starts which could reach an occurrence of the first constant
+    are tried, each by the same pattern confined to the length of an
+    instance, in the order finditer would try them. The spans are those of
+    finditer, and the work is linear in the length of the sentence.
+    """
+
+    def __init__(self, form, pattern, window, steps=0, seconds=0.0):
+        """
+        :param form: string - the abstract form of the construction, e.g. A+一+B
+        :param pattern: compiled pattern of the construction, variables are at most window characters
+        :param window: int - the most characters of a variable
+        :param steps: int - the most starts tried in a sentence, 0 for no limit
+        :param seconds: float - the most time spent on a sentence, 0 for no limit; the result then
+                        depends on the load of the machine, steps bounds the work reproducibly
+        """
+        self.pattern = pattern
+        self.window = window
+        self.steps = steps
+        self.seconds = seconds
+        # The number of sentences which ran out of the budget
+        self.exceeded = 0
+
+        components = form.split("+")
+        variables = [bool(re.search("[a-zA-Z]", component)) for component in components]
+        constants = [component for component, variable in zip(components, variables) if not variable]
+
+        self.length = window * sum(variables) + sum(len(constant) for constant in constants)
+        self.anchor = constants[0] if len(constants) > 0 else None
+        # The variables before the first constant
+        self.prefix = variables.index(False) if len(constants) > 0 else 0
+
+    def _starts(self, text, position):
+        """ The starts which could reach an occurrence of the first constant, in increasing order """
+        if self.anchor is None:
+            for start in range(position, len(text)):
+                yield start
+            return
+
+        # The starts before untried were all tried for the former occurrences
+        untried = position
+        while True:
+            found = text.find(self.anchor, untried + self.prefix)
+            if found < 0:
+                return
+
+            for start in range(max(untried, found - self.prefix * self.window), found - self.prefix + 1):
+                yield start
+            untried = found - self.prefix + 1
+
+    def spans(self, text):
+        """
+        Find the instances of the construction, the same as finditer
+        :param text: string - the sentence
+        :return: list of tuples - (start, end) of each instance
+        """
+        spans, position, steps = list(), 0, 0
+        deadline = time.perf_counter() + self.seconds if self.seconds > 0 else None
+
+        while True:
+            match = None
+            for start in self._starts(text, position):
+                steps += 1
+                if (self.steps > 0 and steps > self.steps) or \
+                        (deadline is not None and time.perf_counter() > deadline):
+                    self.exceeded += 1
+                    return spans
+
+                match = self.pattern.match(text, start, min(len(text), start + self.length))
+                if match is not None:
+                    break
+
+            if match is None:
+                return spans
+
+            spans.append(match.span())
+            position = match.end()
@@ -0,0 +1,208 @@
+from collections import OrderedDict
+import functools
+import json
+import os
+import resource
+import sys
+import time
+
+
+def timed(name):
+    """
+    Time the calls of a method as a layer of the metrics of its object
+    :param name: string - the name of the layer
+    :return: the decorator
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.layer(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def peak_rss():
+    """ The peak resident set size of the process in megabytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+class _Layer(object):
+    """ The context of a timed layer, the time of the nested layers is excluded """
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._exit()
+        return False
+
+
+class Metrics(object):
+    """ Wall time and CPU time of each layer and the counters of a run """
+
+    def __init__(self, mode, form, path):
+        self.mode = mode
+        self.form = form
+        self.path = path
+        self.layers = OrderedDict()
+        self.counters = OrderedDict()
+        self.sentences = 0
+        self.characters = 0
+        self._stack = list()
+        self._start = None
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    def start(self):
+        self._start = (time.time(), time.perf_counter(), time.process_time())
+
+    def stop(self):
+        _, wall, cpu = self._start
+        self._wall = time.perf_counter() - wall
+        self._cpu = time.process_time() - cpu
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def _exit(self):
+        name, wall, cpu, nested_wall, nested_cpu = self._stack.pop()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+        layer = self.layers.setdefault(name, [0, 0.0, 0.0])
+        layer[0] += 1
+        layer[1] += wall - nested_wall
+        layer[2] += cpu - nested_cpu
+
+        if len(self._stack) > 0:
+            self._stack[-1][3] += wall
+            self._stack[-1][4] += cpu
+
+    def layer(self, name):
+        """
+        Time a block as a layer
+        :param name: string - the name of the layer
+        :return: context manager
+        """
+        return _Layer(self, name)
+
+    def iterate(self, iterable, name):
+        """
+        Time the iteration of an iterable as a layer, e.g. the reading of the corpus
+        :param iterable: the iterable to consume
+        :param name: string - the name of the layer
+        :return: generator - the items of the iterable
+        """
+        iterator = iter(iterable)
+
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+
+            yield item
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, text):
+        """ Count a sentence of the output """
+        self.sentences += 1
+        self.characters += len(text)
+
+    def report(self):
+        """
+        The machine-readable report of the run
+        :return: dict
+        """
+        layers = OrderedDict()
+        for name, (calls, wall, cpu) in self.layers.items():
+            layers[name] = OrderedDict([
+                ("calls", calls),
+                ("wall_seconds", round(wall, 6)),
+                ("cpu_seconds", round(cpu, 6)),
+                ("sentences_per_second", round(self.sentences / wall, 1) if wall > 0 else None),
+                ("characters_per_second", round(self.characters / wall, 1) if wall > 0 else None)
+            ])
+
+        started = self._start[0] if self._start is not None else time.time()
+        return OrderedDict([
+            ("mode", self.mode),
+            ("form", self.form),
+            ("path", self.path),
+            ("started", time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started))),
+            ("wall_seconds", round(self._wall, 6)),
+            ("cpu_seconds", round(self._cpu, 6)),
+            ("sentences", self.sentences),
+            ("characters", self.characters),
+            ("sentences_per_second", round(self.sentences / self._wall, 1) if self._wall > 0 else None),
+            ("characters_per_second", round(self.characters / self._wall, 1) if self._wall > 0 else None),
+            ("peak_rss_mb", round(peak_rss(), 1)),
+            ("layers", layers),
+            ("counters", self.counters)
+        ])
+
+    def prometheus(self):
+        """
+        The report in the Prometheus text format, e.g. for the textfile collector of node_exporter
+        :return: string
+        """
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        base = 'mode="{}",form="{}",path="{}"'.format(escape(self.mode), escape(self.form), escape(self.path))
+        report = self.report()
+        lines = list()
+
+        def gauge(metric, description, samples):
+            lines.append("# HELP autoannotator_{} {}".format(metric, description))
+            lines.append("# TYPE autoannotator_{} gauge".format(metric))
+            for labels, value in samples:
+                lines.append("autoannotator_{}{{{}}} {}".format(metric, base + labels, value))
+
+        gauge("wall_seconds", "Wall time of the run", [("", report["wall_seconds"])])
+        gauge("cpu_seconds", "CPU time of the run", [("", report["cpu_seconds"])])
+        gauge("sentences", "Sentences annotated", [("", report["sentences"])])
+        gauge("characters", "Characters annotated", [("", report["characters"])])
+        gauge("peak_rss_megabytes", "Peak resident set size", [("", report["peak_rss_mb"])])
+        gauge("layer_wall_seconds", "Wall time of each layer, nested layers excluded",
+              [(',layer="{}"'.format(escape(name)), layer["wall_seconds"]) for name, layer in report["layers"].items()])
+        gauge("layer_cpu_seconds", "CPU time of each layer, nested layers excluded",
+              [(',layer="{}"'.format(escape(name)), layer["cpu_seconds"]) for name, layer in report["layers"].items()])
+        gauge("layer_calls", "Calls of each layer",
+              [(',layer="{}"'.format(escape(name)), layer["calls"]) for name, layer in report["layers"].items()])
+        gauge("count", "Counters of the run",
+              [(',counter="{}"'.format(escape(name)), value) for name, value in report["counters"].items()])
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output, prometheus=False):
+        """
+        Write the report next to the output file
+        :param output: string - the path of the output file, e.g. ../data/output/A+一+B.xml
+        :param prometheus: boolean - also write the report in the Prometheus text format
+        :return: string - the path of the JSON report
+        """
+        stem = os.path.splitext(output)[0]
+
+        with open(stem + ".metrics.json", "w", encoding="utf-8") as fp:
+            json.dump(self.report(), fp, ensure_ascii=False, indent=4)
+
+        if prometheus:
+            with open(stem + ".prom", "w", encoding="utf-8") as fp:
+                fp.write(self.prometheus())
+
+        return stem + ".metrics.json"
@@ -0,0 +1,289 @@
+import utils
+import itertools
+import math
+import numpy as np
+
+# The defaults of GaussianMixture and of the KMeans which initializes it
+TOL, MAX_ITER, REG_COVAR = 1e-3, 100, 1e-6
+KMEANS_TOL, KMEANS_MAX_ITER = 1e-4, 300
+EPS = 10 * np.finfo(np.float64).eps
+
+
+# The products go through matmul, BLAS rounds them as it does for sklearn, so ties break alike
+def _squared(centers, points, norms):
+    """ The squared distances from the centers to the points, in the order sklearn sums them """
+    distances = -2 * (centers @ points.transpose(0, 2, 1))
+    distances += np.einsum("bmd,bmd->bm", centers, centers)[:, :, np.newaxis]
+    distances += norms[:, np.newaxis, :]
+
+    return np.maximum(distances, 0)
+
+
+def _assign(points, centers):
+    """ The nearest center of each point, the first one on a tie """
+    distances = -2.0 * (points @ centers.transpose(0, 2, 1))
+    distances += np.einsum("bkd,bkd->bk", centers, centers)[:, np.newaxis, :]
+
+    return np.argmin(distances, axis=2)
+
+
+def _relocate(points, centers, sums, weights, labels):
+    """ Move the empty clusters of a sentence to the points farthest from their centers """
+    empty = np.flatnonzero(weights == 0)
+    distances = ((points - centers[labels]) ** 2).sum(axis=1)
+    if np.max(distances) == 0:
+        # There are fewer distinct points than clusters
+        return
+
+    farthest = np.argpartition(distances, -len(empty))[:-len(empty) - 1:-1]
+    for cluster, index in zip(empty, farthest):
+        sums[labels[index]] -= points[index]
+        sums[cluster] = points[index]
+        weights[cluster] = 1
+        weights[labels[index]] -= 1
+
+
+def _average(centers, sums, weights):
+    """ The centers of a sentence with an empty cluster, which takes the place of the biggest one """
+    biggest = np.argmax(weights)
+    for cluster in range(len(weights)):
+        if weights[cluster] > 0:
+            centers[cluster] = sums[cluster] * (1.0 / weights[cluster])
+        else:
+            centers[cluster] = centers[biggest] if biggest < cluster else sums[biggest]
+
+
+def _cholesky(covariances):
+    """
+    The Cholesky factors of the precisions of 2 x 2 covariances in closed form
+    :param covariances: np-array - (..., 2, 2)
+    :return: tuple - the factors and whether each covariance is positive definite
+    """
+    a, b, c = covariances[..., 0, 0], covariances[..., 1, 0], covariances[..., 1, 1]
+
+    with np.errstate(all="ignore"):
+        first = np.sqrt(a)
+        lower = b / first
+        rest = c - lower * lower
+        second = np.sqrt(rest)
+
+        precisions = np.zeros(covariances.shape)
+        precisions[..., 0, 0] = 1 / first
+        precisions[..., 0, 1] = -(lower * precisions[..., 0, 0]) / second
+        precisions[..., 1, 1] = 1 / second
+
+    return precisions, (a > 0) & (rest > 0)
+
+
+class BatchedMixture(object):
+    """
+    Fit a GaussianMixture on each of many sentences at once
+
+    sklearn fits every sentence with a fresh random state of the same seed,
+    so the k-means++ seeding of all the sentences draws the same random
+    numbers. The sentences of the same length are put into batches, then
+    k-means, its seeding and EM run on the whole batch with NumPy, each
+    sentence stopping when it converges. The steps and the stopping rules are
+    those of GaussianMixture(n_components, random_state=seed) with the full
+    covariances, up to the rounding of the sums. The seeding and the k-means
+    steps repeat the internals of scikit-learn 1.9.1, which are not part of
+    its API, so requirements.txt pins it: run tests/test_mixture.py and
+    benchmarks/bench_cluster.py before upgrading it.
+    """
+
+    def __init__(self, n_components=3, seed=0, min_length=None, size=512):
+        self.n_components = n_components
+        self.seed = seed
+        self.min_length = min_length
+        # The number of sentences in a batch
+        self.size = size
+
+    def _seed(self, points, mask, lengths, norms):
+        """ k-means++ on the centered points of a batch """
+        rows = np.arange(len(points))
+        trials = 2 + int(np.log(self.n_components))
+        random = np.random.RandomState(self.seed)
+
+        # random.choice(n, p=uniform) takes a single uniform number whatever n is
+        sample = random.random_sample()
+        first = np.empty(len(points), dtype=np.intp)
+        for length in np.unique(lengths):
+            cdf = (np.ones(length) / length).cumsum()
+            cdf /= cdf[-1]
+            first[lengths == length] = cdf.searchsorted(sample, side="right")
+
+        centers = np.empty((len(points), self.n_components, points.shape[2]))
+        centers[:, 0] = points[rows, first]
+        closest = _squared(centers[:, :1], points, norms)[:, 0] * mask
+        potential = closest @ np.ones(points.shape[1])
+
+        for index in range(1, self.n_components):
+            values = random.uniform(size=trials)[np.newaxis, :] * potential[:, np.newaxis]
+            cumulative = np.cumsum(closest, axis=1)
+            candidates = (cumulative[:, np.newaxis, :] < values[:, :, np.newaxis]).sum(axis=2)
+            candidates = np.minimum(candidates, lengths[:, np.newaxis] - 1)
+
+            distances = _squared(points[rows[:, np.newaxis], candidates], points, norms)
+            distances = np.minimum(closest[:, np.newaxis, :], distances) * mask[:, np.newaxis, :]
+            potentials = distances @ np.ones(points.shape[1])
+
+            best = np.argmin(potentials, axis=1)
+            potential = potentials[rows, best]
+            closest = distances[rows, best]
+            centers[:, index] = points[rows, candidates[rows, best]]
+
+        return centers
+
+    def _kmeans(self, points, mask, lengths):
+        """ The labels of KMeans(n_clusters, n_init=1) on the points of a batch """
+        counts = lengths[:, np.newaxis]
+        mean = (points * mask[:, :, np.newaxis]).sum(axis=1) / counts
+        tol = (((points - mean[:, np.newaxis, :]) ** 2 * mask[:, :, np.newaxis]).sum(axis=1) / counts).mean(axis=1)
+        tol = tol * KMEANS_TOL
+
+        points = (points - mean[:, np.newaxis, :]) * mask[:, :, np.newaxis]
+        centers = self._seed(points, mask, lengths, np.einsum("bnd,bnd->bn", points, points))
+
+        labels = np.full(mask.shape, -1)
+        strict = np.zeros(len(points), dtype=bool)
+        active = np.arange(len(points))
+        for _ in range(KMEANS_MAX_ITER):
+            if len(active) == 0:
+                break
+
+            values, valid, former = points[active], mask[active], centers[active]
+            assigned = _assign(values, former)
+            members = (assigned[:, :, np.newaxis] == np.arange(self.n_components)) & valid[:, :, np.newaxis]
+            weights = members.sum(axis=1)
+            # The points are summed one after another, as sklearn does
+            sums = np.cumsum(members[:, :, :, np.newaxis] * values[:, :, np.newaxis, :], axis=1)[:, -1]
+
+            for index in np.flatnonzero((weights == 0).any(axis=1)):
+                length = lengths[active[index]]
+                _relocate(values[index, :length], former[index], sums[index], weights[index],
+                          assigned[index, :length])
+
+            latter = sums * (1.0 / np.maximum(weights, 1))[:, :, np.newaxis]
+            for index in np.flatnonzero((weights == 0).any(axis=1)):
+                _average(latter[index], sums[index], weights[index])
+            shift = (np.sqrt(((former - latter) ** 2).sum(axis=2)) ** 2).sum(axis=1)
+            centers[active] = latter
+
+            # Converged when no label changes, or when the centers hardly move
+            same = np.all((assigned == labels[active]) | ~valid, axis=1)
+            strict[active[same]] = True
+            labels[active] = assigned
+            active = active[~(same | (shift <= tol[active]))]
+
+        # The labels match the final centers unless they stopped changing
+        loose = np.flatnonzero(~strict)
+        if len(loose) > 0:
+            labels[loose] = _assign(points[loose], centers[loose])
+
+        return labels
+
+    def _parameters(self, points, mask, resp):
+        """ The weights, means and covariances of the components of a batch """
+        resp = resp * mask[:, :, np.newaxis]
+        nk = resp.sum(axis=1) + EPS
+        means = np.einsum("bnk,bnd->bkd", resp, points) / nk[:, :, np.newaxis]
+
+        differences = points[:, np.newaxis, :, :] - means[:, :, np.newaxis, :]
+        covariances = np.einsum("bnk,bknd,bkne->bkde", resp, differences, differences) / nk[:, :, np.newaxis, np.newaxis]
+        covariances[..., 0, 0] += REG_COVAR
+        covariances[..., 1, 1] += REG_COVAR
+
+        return nk, means, covariances
+
+    @staticmethod
+    def _estimate(points, mask, lengths, weights, means, precisions):
+        """ The mean log-likelihood and the log-responsibilities of a batch """
+        projected = np.einsum("bnd,bkde->bkne", points, precisions) - \
+            np.einsum("bkd,bkde->bke", means, precisions)[:, :, np.newaxis, :]
+        distances = (projected ** 2).sum(axis=3).transpose(0, 2, 1)
+        determinants = np.log(precisions[..., 0, 0]) + np.log(precisions[..., 1, 1])
+
+        weighted = -0.5 * (points.shape[2] * math.log(2 * math.pi) + distances) + \
+            determinants[:, np.newaxis, :] + np.log(weights)[:, np.newaxis, :]
+        top = weighted.max(axis=2)
+        norm = np.log(np.exp(weighted - top[:, :, np.newaxis]).sum(axis=2)) + top
+
+        return (norm * mask).sum(axis=1) / lengths, weighted - norm[:, :, np.newaxis]
+
+    def _fit(self, curves):
+        """ Fit the sentences of a batch, which are long enough """
+        lengths = np.array([len(points) for points in curves])
+        points = np.zeros((len(curves), lengths.max(), 2))
+        mask = np.arange(lengths.max())[np.newaxis, :] < lengths[:, np.newaxis]
+        for index, values in enumerate(curves):
+            points[index, :len(values)] = values
+
+        # GaussianMixture refuses points which are not finite
+        failed = ~np.all(np.isfinite(points), axis=(1, 2))
+        points[failed] = 0
+
+        labels = self._kmeans(points, mask, lengths)
+        resp = (labels[:, :, np.newaxis] == np.arange(self.n_components)).astype(np.float64)
+        nk, means, covariances = self._parameters(points, mask, resp)
+        weights = nk / lengths[:, np.newaxis]
+        precisions, valid = _cholesky(covariances)
+        failed |= ~valid.all(axis=1)
+
+        converged = np.zeros(len(curves), dtype=bool)
+        bound = np.full(len(curves), -np.inf)
+        active = np.flatnonzero(~failed)
+        for _ in range(MAX_ITER):
+            if len(active) == 0:
+                break
+
+            values, valid = points[active], mask[active]
+            lower, resp = self._estimate(values, valid, lengths[active], weights[active], means[active],
+                                         precisions[active])
+            nk, means[active], covariances = self._parameters(values, valid, np.exp(resp))
+            weights[active] = nk / nk.sum(axis=1, keepdims=True)
+            precisions[active], valid = _cholesky(covariances)
+            valid = valid.all(axis=1)
+            failed[active[~valid]] = True
+
+            done = np.abs(lower - bound[active]) < TOL
+            bound[active] = lower
+            converged[active[done & valid]] = True
+            active = active[valid & ~done]
+
+        results = list()
+        fitted = np.flatnonzero(~failed)
+        labels = np.zeros(mask.shape, dtype=np.intp)
+        if len(fitted) > 0:
+            # The labels of the final E-step
+            resp = self._estimate(points[fitted], mask[fitted], lengths[fitted], weights[fitted], means[fitted],
+                                  precisions[fitted])[1]
+            labels[fitted] = np.argmax(resp, axis=2)
+
+        for index, length in enumerate(lengths):
+            if failed[index]:
+                results.append((None, "failed"))
+            else:
+                results.append((labels[index, :length], "converged" if converged[index] else "diverged"))
+
+        return results
+
+    def fit_predict(self, curves):
+        """
+        Cluster the points of sentences
+        :param curves: list of np-array - the points of each sentence
+        :return: list of tuples - the labels, None for a fallback, and the status of the fit
+                 of each sentence in the same order, as clustering._fit returns
+        """
+        results = [(None, "short")] * len(curves)
+        shortest = max(self.n_components, self.min_length or 0)
+
+        # A batch holds sentences of one length, padding would change how BLAS rounds the sums
+        order = sorted((index for index, points in enumerate(curves) if len(points) >= shortest),
+                       key=lambda index: len(curves[index]))
+        for _, group in itertools.groupby(order, key=lambda index: len(curves[index])):
+            for batch in utils.chunked(group, self.size):
+                for index, result in zip(batch, self._fit([np.asarray(curves[index], dtype=np.float64)
+                                                           for index in batch])):
+                    results[index] = result
+
+        return results
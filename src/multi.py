@@ -0,0 +1,108 @@
+from annotator import Annotator
+from prefilter import Prefilter
+from metrics import Metrics
+from writer import open_writer
+from contextlib import ExitStack
+from tqdm import tqdm
+import reader
+import utils
+
+
+class MultiAnnotator(object):
+    """
+    Annotate one corpus for many constructions in a single pass
+
+    The corpus is parsed once, and the sentences of each micro-batch are
+    tagged by jieba once for all the constructions. Only the layers which
+    depend on the construction run per form, each form has its own output.
+    """
+
+    def __init__(self, config, forms, path):
+        self.conf = config
+        self.forms = list(forms)
+        self.path = path
+        self.annotators = [Annotator(self.conf, form, self.path) for form in self.forms]
+        self.metrics = Metrics("multi", ",".join(self.forms), self.path)
+        self.sentences = self.metrics.iterate(
+            reader.iterparse(self.conf.input_path.format(self.path), ",".join(self.forms)), "load")
+
+        # The segmenter and the pool of the clusterer are shared by the constructions
+        self.segmenter = self.annotators[0].segmenter
+        self.clusterer = self.annotators[0].clusterer
+        for annotator in self.annotators:
+            annotator.segmenter = self.segmenter
+            annotator.clusterer = self.clusterer
+            annotator.verbose = False
+
+        # One matcher of the constants of all the constructions
+        self._constants = [set(annotator._constants) for annotator in self.annotators]
+        self.prefilter = Prefilter(set().union(*self._constants))
+
+    def initialize(self):
+        self.annotators[0].initialize()
+
+    def output(self, form):
+        """ The output file of a construction, e.g. ../data/output/A+一+B_news.xml """
+        return self.conf.output_path.format(form + "_" + self.path)
+
+    def _tag(self, batch):
+        """ Tag the sentences which any of the constructions could be found in """
+        with self.metrics.layer("prefilter"):
+            sentences = list()
+            for mark, sentence in batch:
+                found = self.prefilter.found(sentence)
+                if any(constants <= found for constants in self._constants):
+                    sentences.append(sentence)
+
+        with self.metrics.layer("posseg"):
+            calls = self.segmenter.calls
+            self.segmenter.tag_batch(list(dict.fromkeys(sentences)))
+            self.metrics.count("jieba_calls", self.segmenter.calls - calls)
+
+    def store(self):
+        """
+        Annotate the corpus for every construction
+        :return: dict - the number of sentences written for each form
+        """
+        outputs = [self.output(form) for form in self.forms]
+        self.metrics.start()
+        for annotator in self.annotators:
+            annotator.metrics.start()
+
+        with ExitStack() as stack:
+            writers = [stack.enter_context(open_writer(self.conf, output)) for output in outputs]
+
+            progress = tqdm(desc="Annotating the sentences")
+            for batch in utils.chunked(self.sentences, self.conf.batch_size):
+                self._tag(batch)
+
+                for annotator, writer in zip(self.annotators, writers):
+                    for mark, sentence in annotator.annotate_batch(batch):
+                        content = annotator._render(sentence)
+
+                        with annotator.metrics.layer("write"):
+                            writer.write(content)
+
+                for mark, sentence in batch:
+                    self.metrics.observe(sentence)
+                progress.update(len(batch))
+            progress.close()
+
+        self.metrics.stop()
+        self.segmenter.close()
+        self.clusterer.close()
+
+        counts = dict()
+        for annotator, output, writer in zip(self.annotators, outputs, writers):
+            annotator.metrics.stop()
+            annotator._report(output)
+            counts[annotator.form] = writer.count
+            print("Done! [{}] skipped {} of {} sentences, the data was stored in {}".format(
+                annotator.form, annotator.prefilter.skipped, annotator.prefilter.total, output))
+
+        options = getattr(self.conf, "metrics", dict())
+        if options.get("report", True):
+            self.metrics.dump(self.conf.output_path.format(self.path), options.get("prometheus", False))
+
+        print("Complete! {} constructions were annotated over {}".format(len(self.forms), self.path))
+        return counts
@@ -1,27 +1,63 @@
-from xml.etree import ElementTree
-from tqdm import tqdm
+from writer import fragment, open_writer
+from metrics import Metrics
+from dedup import Memo, digest
+from matcher import Matcher
+from collections import OrderedDict, deque
+import itertools
+import reader
 import re
 
+# The pipelines of the worker process by form, with their patterns
+_pipelines = dict()
+# The counters of the matching which the workers report back
+COUNTERS = ("regex_matches", "match_budget_exceeded")
+
+
+def _split_chunk(form, texts, budget):
+    """
+    Match a chunk of sentences in a worker process
+    :param form: string - the abstract form of the construction
+    :param texts: list of string - the sentences
+    :param budget: dict - the steps and seconds a sentence may take to match
+    :return: tuple - the <sentence> fragment of each sentence and the increments of the counters
+    """
+    if form not in _pipelines:
+        pipeline = Pipeline(None, form, None)
+        pipeline.matcher = Matcher(form, pipeline.matcher.pattern, 10, **budget)
+        _pipelines[form] = (pipeline, pipeline._get_pattern())
+
+    pipeline, pattern = _pipelines[form]
+    counters = dict((name, pipeline.metrics.counters.get(name, 0)) for name in COUNTERS)
+    fragments = [fragment(pipeline._split(pattern, text)) for text in texts]
+
+    return fragments, dict((name, pipeline.metrics.counters.get(name, 0) - counters[name]) for name in COUNTERS)
+
 
 class Pipeline(object):
     def __init__(self, config, form, path):
         self.conf = config
         self.form = form
         self.path = path
+        self.metrics = Metrics("pipeline", self.form, self.path)
+        for name in COUNTERS + ("duplicate_sentences",):
+            self.metrics.count(name, 0)
+        self.memo = Memo(getattr(self.conf, "dedup", dict()).get("capacity", 0))
+        options = getattr(self.conf, "pipeline", dict())
+        # The sentences are matched on a pool of processes, chunk by chunk, unless workers is 1
+        self.workers = options.get("workers", 1)
+        self.chunksize = options.get("chunksize", 2048)
+        self.budget = getattr(self.conf, "matcher", dict())
+        self.matcher = Matcher(self.form, re.compile(self._get_pattern()), 10, **self.budget)
 
     # Simple Matching for pipeline annotation
     def _load(self):
-        tree = ElementTree.parse(self.conf.input_path.format(self.path))
-        root = tree.getroot()
-        sentences = root.findall('sentence')
-
-        return sentences
+        return reader.iterparse(self.conf.input_path.format(self.path), self.form)
 
     def _get_pattern(self):
         components = self.form.split('+')
 
         construction = ''
-        for component in tqdm(components, desc='Construction Representation'):
+        for component in components:
             if re.search("[a-zA-Z]", component):
                 construction += '.{1,10}?'
             else:
@@ -29,85 +65,156 @@ class Pipeline(object):
 
         return construction
 
-    def _match(self):
-        sentences = self._load()
-        pattern = self._get_pattern()
-
-        paragraphs = list()
-        for sentence in sentences:
-            text = sentence.text
-            construction = re.findall(pattern, text)
+    def _split(self, pattern, text):
+        """
+        Split a sentence into the context and the instances of construction
+        :param pattern: string - the pattern of the construction
+        :param text: string - the sentence
+        :return: list of tuples - (text, "context") or ([(word, label), ...], "cxn")
+        """
+        exceeded = self.matcher.exceeded
+        spans = self.matcher.spans(text)
+        self.metrics.count("regex_matches", len(spans))
+        self.metrics.count("match_budget_exceeded", self.matcher.exceeded - exceeded)
+
+        paragraph = list()
+        if len(spans):
+            position = []
+            for start, end in spans:
+                if start != 0 and len(position) == 0:
+                    position.append((0, 'context'))
+
+                position += [(start, 'cxn'), (end, 'context')]
+
+            if position[-1][0] != len(text):
+                position.append((len(text), 'context'))
+
+            ranges = list()
+            for i in range(len(position) - 1):
+                # Adjacent instances leave no context between them
+                if position[i][0] < position[i + 1][0]:
+                    ranges.append([position[i], position[i + 1]])
 
-            paragraph = list()
-            if len(construction):
-                position = []
-                for entry in construction:
-                    if text.find(entry) != 0 and (0, 'context') not in position:
-                        position.append((0, 'context'))
+            for r in ranges:
+                paragraph.append((text[r[0][0]:r[1][0]], r[0][1]))
+        else:
+            paragraph.append((text, 'context'))
+
+        sentence = list()
+        for phrase, flag in paragraph:
+            if flag == 'cxn':
+                words = []
+                for i in range(len(phrase)):
+                    if phrase[i] in pattern:
+                        words.append((phrase[i], 'constant'))
+                    else:
+                        words.append((phrase[i], 'variable'))
+                sentence.append((words, flag))
+            else:
+                sentence.append((phrase, flag))
 
-                    position += [(text.find(entry), 'cxn'), (text.find(entry) + len(entry), 'context')]
+        return sentence
 
-                if (len(text), 'context') not in position:
-                    position.append((len(text), 'context'))
+    def _match(self, sentences):
+        pattern = self._get_pattern()
 
-                ranges = list()
-                for i in range(len(position) - 1):
-                    ranges.append([position[i], position[i + 1]])
+        for mark, text in sentences:
+            self.metrics.observe(text)
 
-                for r in ranges:
-                    paragraph.append((text[r[0][0]:r[1][0]], r[0][1]))
+            # Each distinct sentence is matched once
+            key = digest(text)
+            sentence = self.memo.get(key)
+            if sentence is None:
+                sentence = self._split(pattern, text)
+                self.memo.put(key, sentence)
             else:
-                paragraph.append((text, 'context'))
-            paragraphs.append(paragraph)
-
-        contents = list()
-        for paragraph in paragraphs:
-            sentence = list()
-            for phrase, flag in paragraph:
-                if flag == 'cxn':
-                    words = []
-                    for i in range(len(phrase)):
-                        if phrase[i] in pattern:
-                            words.append((phrase[i], 'constant'))
-                        else:
-                            words.append((phrase[i], 'variable'))
-                    sentence.append((words, flag))
-                else:
-                    sentence.append((phrase, flag))
-            contents.append(sentence)
-
-        return contents
-
-    @staticmethod
-    def _create_node(name, content):
-        node = ElementTree.Element(name)
-        node.text = content
-        return node
+                self.metrics.count("duplicate_sentences")
+
+            yield sentence
+
+    def _submit(self, pool, chunk):
+        """ Send the distinct sentences of a chunk, which are not memoized, to the pool """
+        keys = [digest(text) for mark, text in chunk]
+        fragments = [self.memo.get(key) for key in keys]
+
+        missing = OrderedDict()
+        for (mark, text), key, rendered in zip(chunk, keys, fragments):
+            if rendered is None:
+                missing[key] = text
+
+        future = None
+        if len(missing) > 0:
+            future = pool.submit(_split_chunk, self.form, list(missing.values()), self.budget)
+        return chunk, keys, fragments, list(missing.keys()), future
+
+    def _collect(self, chunk, keys, fragments, missing, future):
+        """ Merge the results of a chunk in the order of the corpus """
+        if future is not None:
+            results, counters = future.result()
+            for name, value in counters.items():
+                self.metrics.count(name, value)
+
+            results = dict(zip(missing, results))
+            for key in missing:
+                self.memo.put(key, results[key])
+            fragments = [results[key] if rendered is None else rendered
+                         for key, rendered in zip(keys, fragments)]
+
+        self.metrics.count("duplicate_sentences", len(chunk) - len(missing))
+        for (mark, text), rendered in zip(chunk, fragments):
+            self.metrics.observe(text)
+            yield rendered
+
+    def _parallel(self, sentences):
+        """
+        Match the sentences on a pool of processes
+        :param sentences: iterator - (mark, sentence) of the corpus
+        :return: generator - the <sentence> fragment of each sentence in the order of the corpus
+        """
+        # multiprocessing is loaded only when a pool is needed, it is slow to import
+        from concurrent.futures import ProcessPoolExecutor
+
+        pending = deque()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for chunk in iter(lambda: list(itertools.islice(sentences, self.chunksize)), []):
+                pending.append(self._submit(pool, chunk))
+
+                # Only a few chunks are in flight, so that the memory stays flat
+                if len(pending) > 2 * self.workers:
+                    for rendered in self._collect(*pending.popleft()):
+                        yield rendered
+
+            while len(pending) > 0:
+                for rendered in self._collect(*pending.popleft()):
+                    yield rendered
 
     def annotate(self):
-        contents = self._match()
-
-        leaves = list()
-        for sentence in tqdm(contents):
-            parent = self._create_node('sentence', '')
-            for phrase, flag in sentence:
-                if flag == 'context':
-                    node = self._create_node('', phrase)
-                    parent.append(node)
-                else:
-                    cxn = self._create_node('cxn', '')
-                    for element, tag in phrase:
-                        node = self._create_node(tag, element)
-                        cxn.append(node)
-                    parent.append(cxn)
-            leaf = re.sub('</?>', '', ElementTree.tostring(parent, encoding='utf-8').decode())
-            leaves.append(leaf)
-
-        with open(self.conf.output_pipe.format(self.path), 'w') as fp:
-            fp.write('<?xml version="1.0" encoding="UTF-8"?>' + '\n')
-            fp.write('<document>' + '\n')
-
-            for leaf in leaves:
-                fp.write('\t' + leaf + '\n')
-
-            fp.write('</document>')
+        # tqdm is loaded when the work starts, it is slow to import
+        from tqdm import tqdm
+
+        output = self.conf.output_pipe.format(self.path)
+        options = getattr(self.conf, "metrics", dict())
+        self.metrics.start()
+
+        # A corpus of one chunk is matched in this process, a pool would take longer to start
+        sentences = self.metrics.iterate(self._load(), "load")
+        head = list(itertools.islice(sentences, self.chunksize + 1))
+        sentences = itertools.chain(head, sentences)
+
+        # Write the sentences as soon as they are matched
+        with open_writer(self.conf, output) as writer:
+            if self.workers > 1 and len(head) > self.chunksize:
+                for text in tqdm(self.metrics.iterate(self._parallel(sentences), "match")):
+                    with self.metrics.layer("write"):
+                        writer.write_fragment(text)
+            else:
+                for sentence in tqdm(self.metrics.iterate(self._match(sentences), "match")):
+                    with self.metrics.layer("write"):
+                        writer.write(sentence)
+
+        self.metrics.stop()
+        if options.get("report", True):
+            self.metrics.dump(output, options.get("prometheus", False))
+
+        return writer.count
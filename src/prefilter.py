@@ -0,0 +1,60 @@
+import re
+
+
+class Prefilter(object):
+    """
+    Find the sentences which could contain the construction
+
+    An instance of the construction contains every constant of it, so a
+    sentence missing any constant is wholly context. The constants are
+    searched together by one alternation, tried at every position so that
+    overlapping constants are all found.
+    """
+
+    def __init__(self, constants):
+        self.constants = sorted(set(constants), key=len, reverse=True)
+        self.skipped = 0
+        self.total = 0
+        self._pattern = None
+
+        if len(self.constants) > 0:
+            self._pattern = re.compile("(?=(" + "|".join(re.escape(c) for c in self.constants) + "))")
+
+        # A longer constant found at a position implies the constants inside it
+        self._implies = dict((constant, set(other for other in self.constants if other in constant))
+                             for constant in self.constants)
+
+    def __call__(self, sentence):
+        """
+        Check if the sentence contains every constant
+        :param sentence: string
+        :return: boolean True or False
+        """
+        self.total += 1
+
+        if self._pattern is None:
+            return True
+
+        found = set()
+        for match in self._pattern.finditer(sentence):
+            found |= self._implies[match.group(1)]
+
+            if len(found) == len(self.constants):
+                return True
+
+        self.skipped += 1
+        return False
+
+    def found(self, sentence):
+        """
+        Find every constant in the sentence
+        :param sentence: string
+        :return: set - the constants it contains
+        """
+        found = set()
+
+        if self._pattern is not None:
+            for match in self._pattern.finditer(sentence):
+                found |= self._implies[match.group(1)]
+
+        return found
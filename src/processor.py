@@ -1,5 +1,4 @@
-from xml.etree import ElementTree
-from tqdm import tqdm
+import reader
 import re
 
 
@@ -9,26 +8,11 @@ class Processor(object):
         self.path = self.conf.input_path.format(path)
         self.form = form
 
-    def _parse(self):
-        """ Parse the .xml file """
-        tree = ElementTree.parse(self.path)
-        root = tree.getroot()
-        sentences = root.findall("sentence")
-
-        return sentences
-
     def load(self):
-        """ Extract the sentences from the raw material """
-        sentences = list()
-
-        # Get the sentence nodes by parsing the .xml file
-        nodes = self._parse()
-        index = 0
-        for node in tqdm(nodes, desc="Loading the raw material"):
-            sentences.append((self.form + "_" + str(index), node.text))
-            index += 1
-
-        return sentences
+        """ Extract the sentences from the raw material lazily
+        :return: generator - (mark, sentence) pairs
+        """
+        return reader.iterparse(self.path, self.form)
 
     def construct(self, window):
         """ Build the RegEx pattern for construction and
@@ -50,4 +34,4 @@ class Processor(object):
                 construction[component] = 'constant'
         print("done!")
 
-        return pattern, construction
+        return re.compile(pattern), construction
@@ -0,0 +1,31 @@
+from xml.etree import ElementTree
+
+
+def iterparse(path, form, tag="sentence"):
+    """
+    Stream the sentences of the raw material without building the whole tree
+    :param path: string - the path of the .xml file
+    :param form: string - the abstract form of the construction
+    :param tag: string - the tag of the sentence node
+    :return: generator - (mark, text) pairs in document order
+    """
+    root, depth, index = None, 0, 0
+
+    for event, node in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = node
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only the children of the root are sentences, like root.findall(tag)
+        if depth != 1:
+            continue
+
+        if node.tag == tag:
+            yield form + "_" + str(index), node.text or ""
+            index += 1
+
+        # Release the finished sentence so that the memory stays flat
+        root.clear()
@@ -0,0 +1,92 @@
+from features import TAGS, CODES
+import itertools
+import numpy as np
+
+
+def decide(label, tag, regex, deriv, agree):
+    """
+    The decision tree of the fifth layer for a character
+    :param label: string - the class of the cluster of the character
+    :param tag: string - the tag of the character
+    :param regex: boolean - whether regex != 1
+    :param deriv: boolean - whether deriv != 1
+    :param agree: boolean - whether agree == 1
+    :return: string - the label of the character
+    """
+    if label == "others":
+        if tag == "constant":
+            return "constant" if regex and deriv else "others"
+        elif tag == "variable":
+            if agree and (regex or deriv):
+                return "variable"
+            elif not regex and not deriv:
+                return "others"
+            return "variable"
+        return "variable" if regex else "others"
+
+    if label == "constant":
+        if tag == "constant":
+            return "constant" if regex or deriv else "others"
+        elif tag == "variable":
+            if agree or (regex and deriv):
+                return "variable"
+            return "others"
+        return "others"
+
+    if tag == "constant":
+        return "constant"
+    elif not regex and not agree:
+        return "others"
+    elif not regex and not deriv:
+        return "others"
+    return "variable"
+
+
+def _compile():
+    """ Tabulate the decision tree over every combination of the encoded features """
+    table = np.full((len(TAGS), len(TAGS), 2, 2, 2), CODES["others"], dtype=np.int8)
+
+    for label in ("others", "constant", "variable"):
+        for tag, regex, deriv, agree in itertools.product(TAGS, (False, True), (False, True), (False, True)):
+            table[CODES[label], CODES[tag], int(regex), int(deriv), int(agree)] = \
+                CODES[decide(label, tag, regex, deriv, agree)]
+
+    return table
+
+
+# The label of a character indexed by [class, tag, regex != 1, deriv != 1, agree]
+RULES = _compile()
+
+
+def label(classes, tag, regex, deriv, agree):
+    """
+    Label the characters of a sentence at once
+    :param classes: np-array - the code of the class of the cluster of each character
+    :param tag: np-array - the code of the tag of each character
+    :param regex: np-array - the regex score of each character
+    :param deriv: np-array - the derivation score of each character
+    :param agree: np-array - 1 if the character agrees with another one
+    :return: np-array - the code of the label of each character
+    """
+    regex, deriv, agree = (regex != 1).astype(np.intp), (deriv != 1).astype(np.intp), (agree != 0).astype(np.intp)
+    return RULES[classes, tag, regex, deriv, agree]
+
+
+def smooth(codes):
+    """
+    Hypothesis I: the length of construction cannot be 1
+
+    A character between two "others" becomes "others". Changing a character
+    never changes the decision of the next one, whose left neighbour it is,
+    since the next one is then "others" already, so all the characters are
+    decided at once from the original labels.
+    :param codes: np-array - the code of the label of each character
+    :return: np-array - the smoothed codes
+    """
+    codes = codes.copy()
+
+    if len(codes) > 2:
+        others = codes == CODES["others"]
+        codes[1:-1][others[:-2] & others[2:]] = CODES["others"]
+
+    return codes
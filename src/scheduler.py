@@ -0,0 +1,115 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import Config
+from annotator import Annotator
+from pipeline import Pipeline
+from segmenter import Segmenter
+import glob
+import os
+import time
+
+# The configuration of the worker process, loaded once by the initializer
+_config = None
+
+
+def form_of(path):
+    """
+    Get the form of the construction from the file name, e.g. A+一+B_news.xml
+    :param path: string - the path of the corpus
+    :return: string - the form of the construction
+    """
+    filename = os.path.basename(path).split('.')[0]
+    return filename.split('_')[0]
+
+
+def corpora(pattern):
+    """
+    Find the corpora by a directory or a glob
+    :param pattern: string - a directory or a glob like ../data/input/*.xml
+    :return: list - the sorted paths of the corpora
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def initialize():
+    """
+    Load the configuration and the user dictionary of jieba once per worker, of batch or server mode
+    :return: Config - the configuration of the worker
+    """
+    global _config
+    _config = Config()
+    # The files or the requests are already spread across the processes
+    _config.cluster = dict(_config.cluster, workers=1)
+    _config.pipeline = dict(getattr(_config, "pipeline", dict()), workers=1)
+    Segmenter(_config.userdict).initialize()
+
+    return _config
+
+
+def annotate(path, modes, resume=False):
+    """
+    Annotate a corpus in the worker process
+    :param path: string - the path of the corpus
+    :param modes: list - the modes to run, e.g. ["standard", "pipeline"]
+    :param resume: boolean - continue the standard mode from its checkpoints
+    :return: list of tuples - (mode, the number of sentences, seconds)
+    """
+    corpus, form = os.path.basename(path), form_of(path)
+    _config.input_path = os.path.join(os.path.dirname(path), "{}")
+
+    results = list()
+    for mode in modes:
+        start = time.perf_counter()
+
+        if mode == "standard":
+            annotator = Annotator(_config, form, corpus)
+            annotator.initialize()
+            count = annotator.store(resume)
+        else:
+            count = Pipeline(_config, form, corpus).annotate()
+
+        results.append((mode, count, time.perf_counter() - start))
+
+    return results
+
+
+class Scheduler(object):
+    """ Schedule the corpora across a pool of worker processes """
+
+    def __init__(self, workers=None, modes=("standard", "pipeline"), resume=False):
+        self.workers = workers or os.cpu_count()
+        self.modes = list(modes)
+        self.resume = resume
+
+    def run(self, pattern):
+        """
+        Annotate every corpus found by the pattern
+        :param pattern: string - a directory or a glob
+        :return: list - the paths of the corpora which failed
+        """
+        paths = corpora(pattern)
+        failures = list()
+        print("Done! Get {} corpora from [{}]".format(len(paths), pattern))
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=initialize) as pool:
+            futures = dict((pool.submit(annotate, path, self.modes, self.resume), path) for path in paths)
+
+            for future in as_completed(futures):
+                corpus = os.path.basename(futures[future])
+
+                try:
+                    results = future.result()
+                except Exception as error:
+                    # One broken corpus must not stop the others
+                    failures.append(futures[future])
+                    print("Failed! [{}] - {}: {}".format(corpus, type(error).__name__, error))
+                    continue
+
+                for mode, count, seconds in results:
+                    print("Done! [{}] {}: {} sentences in {:.2f}s ({:.1f} sentences/s)".format(
+                        corpus, mode, count, seconds, count / seconds if seconds > 0 else 0.0))
+
+        print("Complete! {} succeeded, {} failed".format(len(paths) - len(failures), len(failures)))
+        return failures
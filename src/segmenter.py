@@ -0,0 +1,119 @@
+from dedup import Memo
+
+# The user dictionaries already loaded into the jieba of this process,
+# jieba itself is imported on first use since it is slow to load
+_loaded = set()
+
+
+class Segmenter(object):
+    def __init__(self, userdict, separator="\n", hmm=False, cache=None):
+        self.userdict = userdict
+        self.separator = separator
+        # The HMM only discovers unknown words, and costs most of the time
+        self.hmm = hmm
+        self.cache = cache
+        # The number of calls into jieba
+        self.calls = 0
+        # The phrases of instances repeat across the corpus, and a sentence
+        # is tagged once for all the constructions annotated together
+        self._cuts = Memo(1 << 16)
+        self._tags = Memo(1 << 16)
+
+    def initialize(self):
+        """ Load the user dictionary into jieba once per process """
+        if self.userdict not in _loaded:
+            import jieba
+
+            jieba.load_userdict(self.userdict)
+            _loaded.add(self.userdict)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def _align(self, text):
+        """
+        Word Segmentation and POS Tagging of the whole text in one call
+        :param text: string
+        :return: list - the tag of the token covering each character
+        """
+        self.initialize()
+        import jieba.posseg as pseg
+
+        flags = list()
+        self.calls += 1
+
+        for word, flag in pseg.cut(text, HMM=self.hmm):
+            flags.extend([flag] * len(word))
+
+        return flags
+
+    def _lookup(self, namespace, texts):
+        """ Get the cached results, jieba is never touched on a full hit """
+        if self.cache is None:
+            return dict()
+
+        return self.cache.get_many(namespace, texts)
+
+    def _store(self, namespace, results):
+        if self.cache is not None:
+            self.cache.put_many(namespace, results)
+
+    def tag(self, sentence):
+        """
+        Tag a single sentence
+        :param sentence: string
+        :return: tuple - characters and their tags
+        """
+        return self.tag_batch([sentence])[0]
+
+    def tag_batch(self, sentences):
+        """
+        Tag a batch of sentences with a single jieba call
+        :param sentences: list of string
+        :return: list of tuples - characters and their tags, aligned one to one
+        """
+        memoized = dict((sentence, self._tags.get(sentence)) for sentence in sentences)
+        cached = self._lookup("tag", [sentence for sentence, flags in memoized.items() if flags is None])
+        cached.update((sentence, flags) for sentence, flags in memoized.items() if flags is not None)
+        missing = list(dict.fromkeys(sentence for sentence in sentences if sentence not in cached))
+
+        if len(missing) > 0:
+            flags = self._align(self.separator.join(missing))
+
+            fresh, start = dict(), 0
+            for sentence in missing:
+                end = start + len(sentence)
+                fresh[sentence] = flags[start:end]
+                start = end + len(self.separator)
+
+            self._store("tag", fresh)
+            cached.update(fresh)
+
+        for sentence, flags in cached.items():
+            self._tags.put(sentence, flags)
+
+        return [(list(sentence), cached[sentence]) for sentence in sentences]
+
+    def cut(self, phrase):
+        """
+        Word Segmentation of a phrase, the same as jieba.cut
+        :param phrase: string
+        :return: list of words
+        """
+        words = self._cuts.get(phrase)
+        if words is not None:
+            return words
+
+        cached = self._lookup("cut", [phrase])
+
+        if phrase not in cached:
+            self.initialize()
+            import jieba
+
+            cached[phrase] = list(jieba.cut(phrase))
+            self.calls += 1
+            self._store("cut", cached)
+
+        self._cuts.put(phrase, cached[phrase])
+        return cached[phrase]
@@ -0,0 +1,275 @@
+from concurrent.futures import ProcessPoolExecutor
+from dedup import Memo
+from writer import fragment
+import asyncio
+import copy
+import json
+import os
+import signal
+
+# The state of the worker process, kept warm between the requests, for the most recent forms only
+FORMS = 16
+_config = None
+_annotators = Memo(FORMS)
+_pipelines = Memo(FORMS)
+_smoother = None
+
+STATUS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+          413: "Payload Too Large", 415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+
+def initialize():
+    """ Load the configuration, jieba and sklearn once per worker, as the workers of batch mode do """
+    global _config, _smoother
+    import scheduler
+    from smoother import Smoother
+    from sklearn.mixture import GaussianMixture  # noqa: F401 - imported to be warm
+
+    _config = scheduler.initialize()
+    _smoother = Smoother(100)
+
+
+def _annotator(form):
+    """ The annotator of a construction, its patterns and caches are kept between the requests """
+    from annotator import Annotator
+
+    annotator = _annotators.get(form)
+    if annotator is None:
+        annotator = Annotator(_config, form, None)
+        annotator.initialize()
+        annotator.verbose = False
+        # The hat matrices do not depend on the construction
+        annotator.smoother = _smoother
+        _annotators.put(form, annotator)
+
+    return annotator
+
+
+def _pipeline(form):
+    from pipeline import Pipeline
+
+    pipeline = _pipelines.get(form)
+    if pipeline is None:
+        pipeline = Pipeline(_config, form, None)
+        pipeline = (pipeline, pipeline._get_pattern())
+        _pipelines.put(form, pipeline)
+
+    return pipeline
+
+
+def annotate(form, sentences, mode="standard"):
+    """
+    Annotate sentences in the worker process
+    :param form: string - the abstract form of the construction
+    :param sentences: list of string
+    :param mode: string - standard or pipeline
+    :return: list of string - the <sentence> fragment of each sentence, the same as store() writes
+    """
+    if mode == "pipeline":
+        pipeline, pattern = _pipeline(form)
+        return [fragment(pipeline._split(pattern, sentence)) for sentence in sentences]
+
+    annotator = _annotator(form)
+    batch = [(form + "_" + str(index), sentence) for index, sentence in enumerate(sentences)]
+
+    return [fragment(annotator._render(content)) for mark, content in annotator.annotate_batch(batch)]
+
+
+def store(form, path, mode="standard", output=None):
+    """
+    Annotate a whole corpus in the worker process
+    :param form: string - the abstract form of the construction
+    :param path: string - the path of the corpus
+    :param mode: string - standard or pipeline
+    :param output: string - the directory of the output, the configured one by default
+    :return: dict - the output file and the number of sentences
+    """
+    from annotator import Annotator
+    from pipeline import Pipeline
+
+    config = copy.copy(_config)
+    config.input_path = os.path.join(os.path.dirname(os.path.abspath(path)), "{}")
+    corpus = os.path.basename(path)
+    if output:
+        config.output_path = config.output_pipe = os.path.join(output, "{}")
+
+    if mode == "pipeline":
+        count = Pipeline(config, form, corpus).annotate()
+        return {"output": config.output_pipe.format(corpus), "sentences": count}
+
+    annotator = Annotator(config, form, corpus)
+    annotator.initialize()
+    annotator.verbose = False
+    annotator.smoother = _smoother
+    count = annotator.store()
+
+    return {"output": config.output_path.format(corpus), "sentences": count}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super(HTTPError, self).__init__(message)
+        self.status = status
+
+
+class Server(object):
+    """
+    Annotate on demand with warm workers, over HTTP on a TCP port or a Unix socket
+
+        POST /annotate  {"form": "A+一+B", "sentences": ["...", ...], "mode": "standard"}
+                        -> {"fragments": ["<sentence>...</sentence>", ...]}
+        POST /corpus    {"form": "A+一+B", "path": "../data/input/A+一+B.xml", "mode": "standard", "output": "..."}
+                        -> {"output": "...", "sentences": 1000}
+        GET  /health    -> {"status": "ok"}
+
+    The requests are JSON with Content-Type: application/json, the path of
+    /corpus is within the directory of inputs and its output within outputs.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8600, socket=None, workers=2, limit=1 << 24,
+                 inputs="../data/input", outputs="../data/output"):
+        self.host = host
+        self.port = port
+        self.socket = socket
+        self.workers = workers
+        # The largest body of a request in bytes
+        self.limit = limit
+        # /corpus reads and writes within these directories only
+        self.inputs = os.path.realpath(inputs)
+        self.outputs = os.path.realpath(outputs)
+        self._pool = None
+
+    @staticmethod
+    def _confine(path, directory):
+        """
+        Check that a path of a request is within a directory
+        :param path: string - the path given by the request
+        :param directory: string - the real path of the directory
+        :return: string - the path
+        """
+        if not isinstance(path, str) or os.path.commonpath([os.path.realpath(path), directory]) != directory:
+            raise HTTPError(403, "{} is not within {}".format(path, directory))
+
+        return path
+
+    async def _dispatch(self, method, target, headers, body):
+        if target == "/health":
+            return {"status": "ok", "workers": self.workers}
+
+        if target not in ("/annotate", "/corpus"):
+            raise HTTPError(404, "unknown path " + target)
+        if method != "POST":
+            raise HTTPError(405, target + " only accepts POST")
+        # A page can post a form or text/plain without a preflight, but not JSON
+        if headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            raise HTTPError(415, target + " only accepts application/json")
+
+        try:
+            request = json.loads(body.decode("utf-8"))
+            form, mode = request["form"], request.get("mode", "standard")
+            if target == "/annotate":
+                arguments = (form, request["sentences"], mode)
+            else:
+                arguments = (form, request["path"], mode, request.get("output"))
+        except (ValueError, KeyError, TypeError) as error:
+            raise HTTPError(400, "malformed request: {}".format(error))
+
+        if not isinstance(form, str) or len(form) == 0:
+            raise HTTPError(400, "form must be a non-empty string")
+        if mode not in ("standard", "pipeline"):
+            raise HTTPError(400, "unknown mode " + str(mode))
+
+        loop = asyncio.get_running_loop()
+        if target == "/annotate":
+            if not isinstance(arguments[1], list) or not all(isinstance(text, str) for text in arguments[1]):
+                raise HTTPError(400, "sentences must be a list of strings")
+            return {"fragments": await loop.run_in_executor(self._pool, annotate, *arguments)}
+
+        form, path, mode, output = arguments
+        path = self._confine(path, self.inputs)
+        if output:
+            output = self._confine(output, self.outputs)
+
+        return await loop.run_in_executor(self._pool, store, form, path, mode, output)
+
+    async def _respond(self, writer, status, payload, keep):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = "HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\n" \
+               "Content-Length: {}\r\nConnection: {}\r\n\r\n".format(status, STATUS[status], len(body),
+                                                                      "keep-alive" if keep else "close")
+        writer.write(head.encode("ascii") + body)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        """ Serve the requests of a connection one after another """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                method, target, version = (line.decode("latin-1").split() + ["", "", ""])[:3]
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length > self.limit:
+                        raise HTTPError(413, "the request is larger than {} bytes".format(self.limit))
+
+                    body = await reader.readexactly(length)
+                    status, payload = 200, await self._dispatch(method, target, headers, body)
+                except HTTPError as error:
+                    status, payload = error.status, {"error": str(error)}
+                    keep = keep and error.status != 413
+                except ValueError as error:
+                    status, payload, keep = 400, {"error": str(error)}, False
+                except Exception as error:
+                    status, payload = 500, {"error": "{}: {}".format(type(error).__name__, error)}
+
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initialize)
+        # Warm every worker up before the first request comes
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._pool, os.getpid) for _ in range(self.workers)])
+
+        if self.socket:
+            server = await asyncio.start_unix_server(self._handle, path=self.socket)
+            address = self.socket
+        else:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            address = "http://{}:{}".format(self.host, self.port)
+
+        # Stop serving on SIGTERM as well, so that the workers are shut down with the server
+        loop.add_signal_handler(signal.SIGTERM, server.close)
+
+        print("Serving on {} with {} workers".format(address, self.workers))
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._pool.shutdown()
+            if self.socket and os.path.exists(self.socket):
+                os.remove(self.socket)
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("Stopped!")
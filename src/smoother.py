@@ -0,0 +1,120 @@
+from collections import OrderedDict
+import numpy as np
+import utils
+
+
+class Smoother(object):
+    """
+    Fit the curves of many sentences at once
+
+    The points of a sentence are always at x = 0, 1, ..., n - 1, so the fitted
+    values of PolynomialRegression(degree) are a fixed linear map of y for each
+    length n. The map (hat matrix) is computed once per length, and every
+    sentence of that length is then fitted by matrix products. A sentence
+    longer than degree + 1 keeps the map as an orthonormal basis U of the
+    polynomials, n x (degree + 1), and is fitted as U (U^T y) instead of by an
+    n x n matrix. The maps of the least recently seen lengths are dropped
+    beyond capacity bytes.
+    """
+
+    def __init__(self, degree=100, decimals=8, capacity=1 << 28):
+        self.degree = degree
+        # Round away the numerical noise so that ties in y stay ties in y_hat
+        self.decimals = decimals
+        self.capacity = capacity
+        self._hats = OrderedDict()
+        self._size = 0
+        # The lengths which could not be fitted, their curves are left as they are
+        self._failures = set()
+        # The number of sentences left as they are
+        self.fallbacks = 0
+
+    def _monomial(self, length):
+        """ The hat matrix of the pipeline [PolynomialFeatures, StandardScaler, LinearRegression] """
+        x = np.arange(length).reshape(-1, 1)
+        identity = np.eye(length)
+
+        with np.errstate(all="ignore"):
+            model = utils.PolynomialRegression(self.degree).fit(x, identity)
+            return model.predict(x)
+
+    def _legendre(self, length, rcond=1e-15):
+        """
+        The same least squares in a well-conditioned basis, where monomials overflow
+        :return: tuple of np-array - the hat matrix, or None and the orthonormal basis U of its range
+        """
+        if length <= self.degree + 1:
+            # The polynomial interpolates the points exactly
+            return np.eye(length), None
+
+        x = np.linspace(-1, 1, length)
+        basis = np.polynomial.legendre.legvander(x, min(self.degree, length - 1))
+
+        # basis @ pinv(basis) is U U^T over the singular values pinv keeps
+        u, singular, _ = np.linalg.svd(basis, full_matrices=False)
+
+        return None, u[:, singular > rcond * singular[0]]
+
+    def _hat(self, length):
+        """
+        The hat matrix of a length, H or H = U U^T
+        :return: tuple of np-array - H, or None and U
+        """
+        if length in self._hats:
+            self._hats.move_to_end(length)
+            return self._hats[length]
+
+        if length < 2:
+            factors = np.eye(length), None
+        else:
+            try:
+                # x ** degree overflows long before degree + 1 points, the n x n identity is not even built
+                hat = self._monomial(length) if length <= self.degree + 1 else None
+            except ValueError:
+                # x ** degree overflows for long sentences
+                hat = None
+
+            try:
+                if hat is None or not np.all(np.isfinite(hat)):
+                    factors = self._legendre(length)
+                else:
+                    factors = hat, None
+            except np.linalg.LinAlgError:
+                factors = np.eye(length), None
+                self._failures.add(length)
+
+        self._hats[length] = factors
+        self._size += sum(factor.nbytes for factor in factors if factor is not None)
+        while self._size > self.capacity and len(self._hats) > 1:
+            dropped_length, dropped = self._hats.popitem(last=False)
+            self._failures.discard(dropped_length)
+            self._size -= sum(factor.nbytes for factor in dropped if factor is not None)
+
+        return factors
+
+    def fit_transform(self, curves):
+        """
+        Fit the points of sentences grouped by their length
+        :param curves: list of np-array - the y of each sentence
+        :return: list of np-array - y_hat of each sentence in the same order
+        """
+        groups = dict()
+        for position, y in enumerate(curves):
+            groups.setdefault(len(y), list()).append(position)
+
+        results = [None] * len(curves)
+        for length, positions in groups.items():
+            matrix = np.vstack([curves[position] for position in positions]).reshape(len(positions), length)
+            hat, basis = self._hat(length)
+            if length in self._failures:
+                self.fallbacks += len(positions)
+            if basis is None:
+                fitted = np.round(matrix @ hat.T, self.decimals)
+            else:
+                # U (U^T y) for each row, without the n x n matrix U U^T
+                fitted = np.round((matrix @ basis) @ basis.T, self.decimals)
+
+            for position, y_hat in zip(positions, fitted):
+                results[position] = y_hat
+
+        return results
@@ -1,8 +1,5 @@
 import numpy as np
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, PolynomialFeatures
-from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plot
+import itertools
 import re
 
 
@@ -20,6 +17,23 @@ def expend(points):
     return np.array(x).reshape(-1, 1), np.array(y)
 
 
+def chunked(iterable, size):
+    """
+    Split the iterable into lists of fixed size lazily
+    :param iterable: an iterable of items
+    :param size: int - the size of each chunk
+    :return: generator of lists, the last one could be shorter
+    """
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
 def contains(targets, construction):
     """
     Check if the construction contains X, Y or Z
@@ -72,6 +86,11 @@ def PolynomialRegression(degree):
     :param degree: int
     :return: the model of fitting the data
     """
+    # sklearn is loaded on first use only
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+    from sklearn.linear_model import LinearRegression
+
     return Pipeline([
         ('poly', PolynomialFeatures(degree=degree)),
         ('std', StandardScaler()),
@@ -224,6 +243,8 @@ def tuple_to_str(constructions):
 
 
 def plot_model(model, x, y):
+    import matplotlib.pyplot as plot
+
     y_hat = model.predict(x)
 
     plot.scatter(x, y)
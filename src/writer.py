@@ -0,0 +1,172 @@
+import os
+import re
+
+# The pieces of a rendered sentence: the tags of an instance, its words and the context
+_PIECES = re.compile(r"<cxn>|</cxn>|<(\w+)>([^<]*)</\1>|[^<]+")
+FORMATS = ("xml", "columnar")
+
+
+# The same as xml.sax.saxutils, which would load urllib and slow the start down
+def escape(text):
+    return text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+
+
+def unescape(text):
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
+
+
+def fragment(content):
+    """
+    Render an annotated sentence
+    :param content: list of tuples - (text, "context") or ([(word, tag), ...], "cxn")
+    :return: string - <sentence>...</sentence>
+    """
+    parts = ["<sentence>"]
+
+    for phrase, label in content:
+        if label == "context":
+            parts.append(escape(phrase))
+        else:
+            parts.append("<cxn>")
+            for word, tag in phrase:
+                parts.append("<" + tag + ">" + escape(word) + "</" + tag + ">")
+            parts.append("</cxn>")
+
+    parts.append("</sentence>")
+    return "".join(parts)
+
+
+def parse(text):
+    """
+    Read back a sentence rendered by fragment
+    :param text: string - <sentence>...</sentence>
+    :return: list of tuples - (text, "context") or ([(word, tag), ...], "cxn")
+    """
+    if not text.startswith("<sentence>") or not text.endswith("</sentence>"):
+        raise ValueError("Not a rendered sentence: " + text[:50])
+
+    content, words = list(), None
+    for piece in _PIECES.finditer(text, len("<sentence>"), len(text) - len("</sentence>")):
+        if piece.group(0) == "<cxn>":
+            words = list()
+        elif piece.group(0) == "</cxn>":
+            content.append((words, "cxn"))
+            words = None
+        elif piece.group(1) is not None:
+            words.append((unescape(piece.group(2)), piece.group(1)))
+        else:
+            content.append((unescape(piece.group(0)), "context"))
+
+    return content
+
+
+def open_writer(config, output):
+    """
+    The writer of an output file in the configured formats
+    :param config: Config - output_formats lists "xml" and/or "columnar", ["xml"] by default
+    :param output: string - the path of the XML output, the columnar file is next to it
+    :return: XMLWriter, ColumnarWriter or TeeWriter of both
+    """
+    formats = getattr(config, "output_formats", ["xml"])
+    if len(formats) == 0 or not set(formats) <= set(FORMATS):
+        raise ValueError("Unknown output formats {}, expected some of {}".format(formats, FORMATS))
+
+    writers = list()
+    if "xml" in formats:
+        writers.append(XMLWriter(output))
+    if "columnar" in formats:
+        # numpy is loaded only for the columnar output, pipeline mode starts without it
+        from columnar import ColumnarWriter, columnar_path
+
+        writers.append(ColumnarWriter(columnar_path(output)))
+
+    return writers[0] if len(writers) == 1 else TeeWriter(writers)
+
+
+class XMLWriter(object):
+    """
+    Write the annotated sentences one by one, without building the tree
+
+    The file is written aside and put in place only when the run succeeds,
+    so a failed run leaves no output which looks complete.
+    """
+
+    def __init__(self, path, buffering=1 << 16):
+        self.path = path
+        self.buffering = buffering
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self):
+        self._file = open(self.path + ".tmp", "w", encoding="utf-8", buffering=self.buffering)
+        # Write the metadata and the root tag
+        self._file.write('<?xml version="1.0" encoding="UTF-8"?>' + "\n")
+        self._file.write("<document>" + "\n")
+
+    def write(self, content):
+        self.write_fragment(fragment(content))
+
+    def write_fragment(self, text):
+        """ Write a sentence already rendered by fragment """
+        self._file.write("\t" + text + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.write("</document>")
+            self._file.close()
+            self._file = None
+            os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        """ Drop the output of a failed run """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.path + ".tmp")
+
+
+class TeeWriter(object):
+    """ Write the annotated sentences to several outputs at once """
+
+    def __init__(self, writers):
+        self.writers = writers
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        # Each writer decides what to keep of a failed run
+        for writer in self.writers:
+            writer.__exit__(*args)
+
+    @property
+    def count(self):
+        return self.writers[0].count
+
+    def open(self):
+        for writer in self.writers:
+            writer.open()
+
+    def write(self, content):
+        for writer in self.writers:
+            writer.write(content)
+
+    def write_fragment(self, text):
+        for writer in self.writers:
+            writer.write_fragment(text)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# The modules of src are imported by their names, as the benchmarks import them
+import benchmarks  # noqa: E402,F401
@@ -0,0 +1,20 @@
+from benchmarks.bench_cluster import edge_curves
+from clustering import _fit
+from mixture import BatchedMixture
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_batched_mixture_matches_sklearn(seed):
+    """ The labels and statuses of BatchedMixture are those of GaussianMixture, sentence by sentence """
+    curves = edge_curves(seed, 500)
+    batched = BatchedMixture(3, 0, 3).fit_predict(curves)
+
+    for index, (points, (labels, status)) in enumerate(zip(curves, batched)):
+        expected, reference = _fit(points, 3, 0, 3)
+        assert status == reference, "sentence {}".format(index)
+        if expected is None:
+            assert labels is None, "sentence {}".format(index)
+        else:
+            assert np.array_equal(labels, expected), "sentence {}".format(index)
@@ -0,0 +1,54 @@
+from benchmarks import SOURCE
+from benchmarks.bench_rules import AGREE, CLASSES, DERIV, LABELS, REGEX, content, decide, smooth
+from features import TAGS, CODES
+import itertools
+import numpy as np
+import pytest
+import rules
+
+# Every sequence of labels up to this length is checked
+LONGEST = 8
+
+
+@pytest.fixture(scope="module", params=["A+一+B", "越+A+越+B"])
+def annotator(request):
+    from config import Config
+    from annotator import Annotator
+
+    with pytest.MonkeyPatch.context() as patch:
+        # The configuration is read relative to src
+        patch.chdir(SOURCE)
+        annotator = Annotator(Config(), request.param, None)
+
+    annotator.verbose = False
+    return annotator
+
+
+def test_rule_table_matches_decision_tree():
+    """ rules.RULES labels every combination of class, tag and scores as the former if/elif tree """
+    combinations = list(itertools.product(CLASSES, TAGS, REGEX, DERIV, AGREE))
+    columns = list(zip(*combinations))
+    codes = rules.label(np.array([CODES[name] for name in columns[0]]), np.array([CODES[tag] for tag in columns[1]]),
+                        np.array(columns[2]), np.array(columns[3]), np.array(columns[4]))
+
+    for combination, code in zip(combinations, codes.tolist()):
+        assert TAGS[code] == decide(*combination), combination
+
+
+def sequences():
+    for length in range(LONGEST + 1):
+        for labels in itertools.product(LABELS, repeat=length):
+            yield list(zip("abcdefghijklmnopqrstuvwxyz", labels))
+
+
+def test_smooth_matches_sequential_hypothesis():
+    """ rules.smooth decides Hypothesis I at once as the former loop did character after character """
+    for series in sequences():
+        codes = rules.smooth(np.array([CODES[label] for word, label in series], dtype=np.int8))
+        assert [(word, TAGS[code]) for (word, _), code in zip(series, codes.tolist())] == smooth(series), series
+
+
+def test_content_matches_quadratic_hypothesis(annotator):
+    """ Annotator._content groups the labels as the former loop with Hypothesis II over the whole content did """
+    for series in sequences():
+        assert annotator._content(series) == content(series, annotator._length), series
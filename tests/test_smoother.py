@@ -0,0 +1,65 @@
+from benchmarks import SOURCE
+from benchmarks.bench_fit import per_sentence, tied
+from benchmarks.corpus import Generator
+from smoother import Smoother
+import numpy as np
+import pytest
+import utils
+
+
+@pytest.fixture(scope="module")
+def curves(tmp_path_factory):
+    """ The curves of a generated corpus, as Annotator.fit takes them """
+    from config import Config
+    from annotator import Annotator
+
+    path = str(tmp_path_factory.mktemp("corpus") / "A+一+B_synthetic.xml")
+    Generator("A+一+B", length=30, density=0.5, seed=0).write(path, 300)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(SOURCE)
+        config = Config()
+        config.input_path = "{}"
+        config.cache = dict()
+        annotator = Annotator(config, "A+一+B", path)
+        annotator.initialize()
+        annotator.verbose = False
+        return [y for mark, y in annotator._process()]
+
+
+# The former fit overflows on long sentences, as it did in Annotator.fit
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_smoother_matches_per_sentence_fit(curves):
+    """ The batched fit chooses the increasing sections of the per-sentence PolynomialRegression, up to ties """
+    fitted = Smoother(100).fit_transform(curves)
+    compared = 0
+
+    for index, (reference, y_hat) in enumerate(zip(per_sentence(curves, 100), fitted)):
+        if reference is None:
+            # x ** degree overflowed in the former fit
+            continue
+
+        expected, actual = utils.growth(list(reference)), utils.growth(list(y_hat))
+        assert expected == actual or tied(reference, expected, actual), "sentence {}".format(index)
+        compared += 1
+
+    assert compared > 0
+
+
+def test_fallbacks_count_sentences(monkeypatch):
+    """ Every sentence of a length which cannot be fitted is counted, also once its hat matrix is cached """
+    smoother = Smoother(100)
+    legendre = smoother._legendre
+
+    def failing(length):
+        if length == 150:
+            raise np.linalg.LinAlgError
+        return legendre(length)
+
+    monkeypatch.setattr(smoother, "_legendre", failing)
+    curves = [np.ones(150), np.arange(150.0), np.ones(120)]
+    fitted = smoother.fit_transform(curves)
+    smoother.fit_transform([np.ones(150)])
+
+    assert smoother.fallbacks == 3
+    assert np.array_equal(fitted[1], curves[1])